@@ -1,9 +1,20 @@
-import anthropic
-import os 
+import argparse
+from responseCache import open_cache
+from chatProviders import AnthropicProvider, run
 
-# Set up the API client
-apiKey = os.getenv("ANTHROPIC_API_KEY")
-client = anthropic.Anthropic(api_key=apiKey)
+parser = argparse.ArgumentParser(description="Chat with Claude, one question at a time.")
+parser.add_argument("--cache", action="store_true",
+                    help="answer repeated questions from the response cache instead of sampling a new answer")
+args = parser.parse_args()
+
+# Each question is sent on its own. Answers are sampled at temperature 0.99, so a
+# cached answer would replace a fresh one; the response cache is only used with --cache
+provider = AnthropicProvider(
+    "claude-3-opus-20240229",
+    max_tokens=1000,
+    temperature=0.99,
+    cache=open_cache() if args.cache else None
+)
 
 # Start the chat loop
 while True:
@@ -15,15 +26,12 @@ while True:
         print("Claude: Goodbye!")
         break
     
-    # Send the message to Claude and get the response
-    response = client.messages.create(
-        model="claude-3-opus-20240229",
-        max_tokens=1000,
-        temperature=0.99,
-        messages=[
-            {"role": "user", "content": user_input}
-        ]
-    )
+    # Send the message to Claude and get the response; Ctrl+C cancels it
+    try:
+        reply = run(provider.send(user_input))
+    except KeyboardInterrupt:
+        print("(cancelled)")
+        continue
     
     # Print Claude's response
-    print("Claude:", response.content[0].text)
\ No newline at end of file
+    print("Claude:", reply.text)
\ No newline at end of file
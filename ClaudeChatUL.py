@@ -1,18 +1,9 @@
-import anthropic
 import os
-import PyPDF2
-
-# Set up the API client
-apiKey = os.getenv("ANTHROPIC_API_KEY")
-client = anthropic.Anthropic(api_key=apiKey)
-
-def extract_text_from_pdf(file_path):
-    with open(file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-    return text
+from llmMetrics import cache_summary
+from conversationContext import ConversationContext, load_instructions
+from pdfText import iter_pdf_pages
+from documentIndex import DocumentIndex, with_passages
+from chatProviders import AnthropicProvider, run
 
 def upload_file(file_path):
     """Simulate file upload for Anthropic (you can modify based on actual API needs)."""
@@ -26,8 +17,13 @@ def upload_file(file_path):
         print(f"Failed to upload file: {e}")
         return None
 
-# Start the chat loop
-messages = []
+# Start the chat loop; the history sent to Claude is kept within a token budget, and the
+# config.json instructions and uploaded PDFs are cached between turns
+context = ConversationContext(system=load_instructions())
+provider = AnthropicProvider("claude-3-opus-20240229", max_tokens=1000, temperature=0.99, context=context)
+
+# Large PDFs are indexed; each question is sent with the passages that match it best
+index = DocumentIndex()
 
 print("*****************   N E W   C H A T   *****************")
 
@@ -45,31 +41,39 @@ while True:
         file_path = user_input[5:].strip()
         file_id = upload_file(file_path)
         if file_id:
-            file_content = extract_text_from_pdf(file_id)
+            file_content, chunks = index.ingest(file_path, list(iter_pdf_pages(file_id)))
+            if file_content is None:
+                print(f"File '{file_path}' indexed as {chunks} passages; questions will include the best matches.")
+                print(">>>>>>>>>>>>>>>>>>>>>>>>>>")
+                continue
+            # Goes out with the next question
             user_message = f"I've uploaded a PDF file. Here's the content:\n\n{file_content}\n\nPlease analyze this PDF content."
-            messages.append({"role": "user", "content": user_message})
+            context.append("user", user_message, attachment=True)
             print(f"File '{file_path}' uploaded and processed successfully.")
             print(">>>>>>>>>>>>>>>>>>>>>>>>>>")
             continue
 
-    # Add user message to the conversation
-    messages.append({"role": "user", "content": user_input})
+    # Send the user message with the matching passages of indexed PDFs
+    if len(index):
+        user_message = with_passages(user_input, index.passages(user_input))
+        options = {"attachment": True, "later": user_input}
+    else:
+        user_message = user_input
+        options = {}
 
-    # Send the message to Claude and get the response
+    # Send the message to Claude and get the response; the provider adds both to the
+    # conversation, and Ctrl+C cancels the request
     try:
-        response = client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=1000,
-            temperature=0.99,
-            messages=messages
-        )
-        assistant_message = response.content[0].text
+        reply = run(provider.send(user_message, **options))
+        assistant_message = reply.text
+        if context.last_trim:
+            print(f"(context: {context.last_trim})")
+        print(f"(prompt cache: {cache_summary([reply.metrics])})")
+    except KeyboardInterrupt:
+        assistant_message = "(cancelled)"
     except Exception as e:
         assistant_message = f"Error: {e}"
 
     # Print Claude's response with <<<<<< markers
     print("\n<<<<<<<<<<<<<<<<<<<<<<<<<<")
     print(f"Claude: {assistant_message}")
-    
-    # Add Claude's response to the conversation
-    messages.append({"role": "assistant", "content": assistant_message})
@@ -1,38 +1,41 @@
 import os
-import anthropic
-import PyPDF2
-from PyQt5.QtWidgets import QApplication, QWidget, QTextEdit, QLineEdit, QVBoxLayout
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl
+import time
+from chatProviders import AnthropicProvider, run
+from pdfText import iter_pdf_pages
+from documentIndex import DocumentIndex, with_passages
+from conversationContext import ConversationContext, load_instructions
+from requestQueue import RequestQueue
+from transcriptView import TranscriptView
+from PyQt5.QtWidgets import QApplication, QWidget, QLineEdit, QVBoxLayout, QPushButton
+from PyQt5.QtCore import Qt, QTimer, QUrl
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent
 
-class ClaudeWorker(QThread):
-    result_ready = pyqtSignal(str)  # Signal to emit when the result is ready
-
-    def __init__(self, user_input, messages, anthropic_client):
-        super().__init__()
-        self.user_input = user_input
-        self.messages = messages
-        self.anthropic_client = anthropic_client
-
-    def run(self):
-        # Send the request to Claude
-        try:
-            # Add user input to the conversation
-            self.messages.append({"role": "user", "content": self.user_input})
-
-            # Send the message to Claude and get the response
-            response = self.anthropic_client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=1000,
-                temperature=0.99,
-                messages=self.messages
-            )
-            assistant_message = response.content[0].text
-            self.messages.append({"role": "assistant", "content": assistant_message})
-
-            self.result_ready.emit(assistant_message)
-        except Exception as e:
-            self.result_ready.emit(f"Error: {e}")
+# Interval at which streamed text is flushed into the text area (milliseconds)
+STREAM_FLUSH_MS = 50
+
+# Worker threads extracting dropped PDFs; their prompts are still sent in drop order
+EXTRACT_WORKERS = 4
+
+# Send one prompt to Claude from a worker thread, streaming the answer through request.
+# With a document index, a question is sent with the passages that best match it.
+def ask_claude(request, user_input, provider, attachment=False, index=None):
+    if request.is_cancelled():
+        # Cancelled as the worker picked it up
+        return ""
+    later = None
+    if index is not None and len(index) and not attachment:
+        # Later turns keep the question alone, so passages are only sent once
+        later = user_input
+        user_input = with_passages(user_input, index.passages(user_input))
+        attachment = True
+    # The provider adds the prompt and answer to its conversation, of which only a
+    # budgeted view is sent; a cancelled answer keeps what was received
+    reply = run(provider.stream(user_input, on_delta=request.emit_delta, attachment=attachment, later=later))
+    return reply.text
+
+# Extract a dropped PDF; large ones are indexed instead of being sent whole
+def read_pdf(request, file_path, index):
+    return index.ingest(file_path, list(iter_pdf_pages(file_path)))
 
 class ClaudeChatbot(QWidget):
     def __init__(self):
@@ -44,8 +47,26 @@ class ClaudeChatbot(QWidget):
             print("Anthropic API key is not set. Please set the ANTHROPIC_API_KEY environment variable.")
             exit(1)
         
-        self.client = anthropic.Anthropic(api_key=apiKey)
-        self.messages = []  # Store the conversation messages
+        # Conversation messages, sent within a token budget; the config.json instructions
+        # and dropped PDFs are marked for Anthropic's prompt cache
+        self.context = ConversationContext(system=load_instructions())
+        self.provider = AnthropicProvider("claude-3-opus-20240229", max_tokens=1000, temperature=0.99,
+                                          context=self.context)
+        self.index = DocumentIndex()  # Passages of the large PDFs dropped in this session
+        self.pending_deltas = []  # Streamed text not yet shown
+        self.streamed_text = ""  # Streamed text of the current answer shown so far
+        self.prompts = {}  # request ID -> prompt, until its answer is shown
+        self.pdf_paths = {}  # extraction request ID -> PDF path
+
+        # Prompts run one at a time, in order; dropped PDFs are extracted in parallel
+        self.chat_queue = RequestQueue(workers=1, parent=self)
+        self.chat_queue.started.connect(self.on_request_started)
+        self.chat_queue.delta_ready.connect(self.queue_delta)
+        self.chat_queue.result_ready.connect(self.display_results)
+        self.chat_queue.pending_changed.connect(self.update_status)
+        self.extract_queue = RequestQueue(workers=EXTRACT_WORKERS, parent=self)
+        self.extract_queue.result_ready.connect(self.send_pdf_text)
+        self.extract_queue.pending_changed.connect(self.update_status)
 
         # Initialize GUI
         self.init_gui()
@@ -58,8 +79,8 @@ class ClaudeChatbot(QWidget):
         layout = QVBoxLayout()
 
         # Create text area for displaying messages
-        self.text_area = QTextEdit(self)
-        self.text_area.setReadOnly(True)
+        # Only the messages in view are drawn, so long sessions stay responsive
+        self.text_area = TranscriptView(self)
         layout.addWidget(self.text_area)
 
         # Input area for user messages
@@ -67,9 +88,20 @@ class ClaudeChatbot(QWidget):
         self.user_input.setPlaceholderText("Type your message and press Enter")
         layout.addWidget(self.user_input)
 
+        # Button for cancelling the running and queued requests
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_requests)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
         # Connect Enter key to input processing
         self.user_input.returnPressed.connect(self.on_enter_pressed)
 
+        # Coalesce streamed deltas into one text area update per interval
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_MS)
+        self.stream_timer.timeout.connect(self.flush_deltas)
+
         # Set layout
         self.setLayout(layout)
 
@@ -80,33 +112,31 @@ class ClaudeChatbot(QWidget):
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
-        urls = event.mimeData().urls()
-        if urls:
-            file_path = urls[0].toLocalFile()
-            self.upload_file(file_path)
+        for url in event.mimeData().urls():
+            if url.isLocalFile():
+                self.upload_file(url.toLocalFile())
 
     def upload_file(self, file_path):
-        try:
-            if not file_path.lower().endswith('.pdf'):
-                self.text_area.append(f"Error: Only PDF files are supported.")
-                return
-
-            pdf_text = self.extract_text_from_pdf(file_path)
+        if not file_path.lower().endswith('.pdf'):
+            self.text_area.append(f"Error: Only PDF files are supported.")
+            return
+        request_id = self.extract_queue.submit(read_pdf, file_path, self.index)
+        self.pdf_paths[request_id] = file_path
+
+    def send_pdf_text(self, request_id, result, cancelled):
+        file_path = self.pdf_paths.pop(request_id)
+        if cancelled:
+            self.text_area.append(f"Upload of '{file_path}' cancelled.")
+        elif isinstance(result, Exception):
+            self.text_area.append(f"Failed to upload file: {result}")
+        elif result[0] is None:
+            self.text_area.append(f"PDF '{file_path}' indexed as {result[1]} passages; "
+                                  f"each question is sent with the passages that match it best.")
+        else:
+            pdf_text = result[0]
             user_message = f"I've uploaded a PDF file. Here's the content:\n\n{pdf_text}\n\nPlease analyze this PDF content."
-            self.messages.append({"role": "user", "content": user_message})
             self.text_area.append(f"PDF '{file_path}' uploaded and processed successfully.")
-            self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
-            self.process_user_input(user_message)  # Automatically send the PDF content for analysis
-        except Exception as e:
-            self.text_area.append(f"Failed to upload file: {e}")
-
-    def extract_text_from_pdf(self, file_path):
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+            self.process_user_input(user_message, attachment=True)  # Automatically send the PDF content for analysis
 
     def on_enter_pressed(self):
         user_input = self.user_input.text().strip()
@@ -114,26 +144,75 @@ class ClaudeChatbot(QWidget):
             self.process_user_input(user_input)
         self.user_input.clear()
 
-    def process_user_input(self, user_input):
-        self.text_area.append(f"Juan: {user_input}")
-        self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
-
-        # Disable the input field during processing
-        self.user_input.setEnabled(False)
+    def process_user_input(self, user_input, attachment=False):
+        # The input stays enabled: prompts typed while Claude answers are queued
+        request_id = self.chat_queue.submit(ask_claude, user_input, self.provider, attachment, self.index)
+        self.prompts[request_id] = user_input
+        if self.chat_queue.pending() > 1:
+            self.text_area.append(f"Queued: {user_input[:80]}")
 
-        # Start the worker thread
-        self.worker_thread = ClaudeWorker(
-            user_input, self.messages, self.client
-        )
-        self.worker_thread.result_ready.connect(self.display_results)
-        self.worker_thread.start()
-
-    def display_results(self, response):
-        self.text_area.append(f"Claude: {response}")
+    def on_request_started(self, request_id):
+        self.text_area.append(f"Juan: {self.prompts[request_id]}")
+        self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
+        self.request_started = time.perf_counter()
+        self.first_token_seconds = None
+        self.streamed_text = ""
+
+    def cancel_requests(self):
+        self.extract_queue.cancel()
+        self.chat_queue.cancel()
+        self.provider.cancel()
+
+    def update_status(self, *args):
+        pending = self.chat_queue.pending() + self.extract_queue.pending()
+        self.cancel_button.setEnabled(pending > 0)
+        status = f" ({pending} pending)" if pending else ""
+        self.user_input.setPlaceholderText("Type your message and press Enter" + status)
+
+    def queue_delta(self, request_id, text):
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.request_started
+        self.pending_deltas.append(text)
+        if not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_deltas(self):
+        if not self.pending_deltas:
+            self.stream_timer.stop()
+            return
+        if not self.streamed_text:
+            self.text_area.append("Claude: ")
+        text = "".join(self.pending_deltas)
+        self.streamed_text += text
+        self.text_area.extend_last(text)
+        self.pending_deltas = []
+
+    def display_results(self, request_id, response, cancelled):
+        user_input = self.prompts.pop(request_id)
+        if cancelled and response is None:
+            # Cancelled before it started
+            self.text_area.append(f"Cancelled: {user_input[:80]}")
+            return
+        self.flush_deltas()
+        self.stream_timer.stop()
+        if isinstance(response, Exception):
+            response = f"Error: {response}"
+        if response != self.streamed_text:
+            # Not streamed, or the stream was cut short by an error
+            self.text_area.append(f"Claude: {response}")
+        if cancelled:
+            self.text_area.append("(cancelled)")
+        total_seconds = time.perf_counter() - self.request_started
+        if self.first_token_seconds is not None:
+            self.text_area.append(f"(first token {self.first_token_seconds * 1000:.0f} ms, total {total_seconds:.1f} s)")
         self.text_area.append("<<<<<<<<<<<<<<<<<<<<<<<<<<")
 
-        # Re-enable the input field after processing is done
-        self.user_input.setEnabled(True)
+    def closeEvent(self, event):
+        # Stop the workers before the window and its client go away
+        self.extract_queue.shutdown()
+        self.provider.cancel()
+        self.chat_queue.shutdown()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication([])
@@ -1,25 +1,149 @@
-import anthropic
-import os 
-
-# Create the client using the API key
-client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-
-message = client.messages.create(
-    model="claude-3-sonnet-20240229",
-    max_tokens=1000,
-    temperature=0.5,
-    messages=[
-        {
-            "role": "user",
-            "content": "Is it true that Emperor Nero declared war on the sea?"
-        }
-    ]
-)
-
-text_blocks = message.content 
-
-# Extract and print the text from the first TextBlock
-for block in text_blocks:
-    print(block.text)
-
-# print(message.content)
\ No newline at end of file
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from httpClients import async_anthropic_client
+from responseCache import open_cache, RESPONSE_CACHE_BYPASS
+from chatProviders import AnthropicProvider, TokenRateLimiter, run
+
+# Ask Claude one question, or a file of questions with --batch:
+#   python ClaudeQA.py "Is it true that Emperor Nero declared war on the sea?"
+#   python ClaudeQA.py --batch questions.txt --output answers.jsonl --concurrency 8 --tokens-per-minute 40000
+#   cat questions.txt | python ClaudeQA.py --batch - --output answers.jsonl
+# A batch file holds one question per line, or JSON lines {"id": ..., "question": ...};
+# blank lines and lines starting with # are skipped. Questions without an id get a hash
+# of their text. Each answer is appended to --output as soon as it arrives, and
+# running the same command again skips the questions already answered there, so a
+# failed or interrupted batch resumes where it stopped.
+
+DEFAULT_QUESTION = "Is it true that Emperor Nero declared war on the sea?"
+
+def question_id(question):
+    return hashlib.sha256(question.encode('utf-8')).hexdigest()[:16]
+
+def read_questions(source):
+    """(id, question) pairs from a batch file, or from stdin when source is "-"."""
+    file = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    questions = []
+    seen = set()
+    with file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                    question = entry["question"].strip()
+                except (ValueError, KeyError, AttributeError) as e:
+                    print(f"[!] Skipping line {number} of {source}: {e!r}")
+                    continue
+                qid = str(entry.get("id") or question_id(question))
+            else:
+                question, qid = line, question_id(line)
+            if qid not in seen:
+                seen.add(qid)
+                questions.append((qid, question))
+    return questions
+
+def answered_ids(path):
+    """Ids with an ok record in an earlier output file; a later line for an id overrides an earlier one."""
+    status = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+                status[record["id"]] = record.get("status")
+            except (ValueError, KeyError, TypeError):
+                continue  # e.g. a line cut short when the previous run was killed
+    return {qid for qid, state in status.items() if state == "ok"}
+
+def build_provider(args, cache, client=None, limiter=None):
+    return AnthropicProvider(args.model, client=client, max_tokens=args.max_tokens, temperature=args.temperature,
+                             cache=cache, bypass=args.no_cache or RESPONSE_CACHE_BYPASS, limiter=limiter)
+
+async def run_batch(questions, args, cache):
+    """Answer questions with args.concurrency workers, appending a JSON line per result to args.output."""
+    client = async_anthropic_client(connections=args.concurrency, max_retries=args.max_retries,
+                                    api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    limiter = TokenRateLimiter(args.tokens_per_minute) if args.tokens_per_minute else None
+    # Questions are independent, so the workers share one provider without a conversation
+    provider = build_provider(args, cache, client, limiter)
+    pending = asyncio.Queue()
+    for entry in questions:
+        pending.put_nowait(entry)
+    counts = {"ok": 0, "error": 0}
+
+    async def worker(output):
+        while not pending.empty():
+            qid, question = pending.get_nowait()
+            start = time.perf_counter()
+            record = {"id": qid, "question": question}
+            try:
+                reply = await provider.send(question)
+                record.update(status="ok", answer=reply.text, model=reply.model,
+                              input_tokens=reply.input_tokens, output_tokens=reply.output_tokens, cached=reply.cached)
+                print(f"[✓] {qid} ({time.perf_counter() - start:.1f} s{', cached' if reply.cached else ''})")
+            except Exception as e:
+                record.update(status="error", error=repr(e))
+                print(f"[✗] {qid}: {e!r}")
+            record["seconds"] = round(time.perf_counter() - start, 3)
+            counts[record["status"]] += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    try:
+        with open(args.output, 'a', encoding='utf-8') as output:
+            await asyncio.gather(*(worker(output) for _ in range(min(args.concurrency, len(questions)))))
+    finally:
+        await client.close()
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ask Claude one question, or a file of questions concurrently.")
+    parser.add_argument("question", nargs="?", default=DEFAULT_QUESTION, help="question to ask")
+    parser.add_argument("--batch", metavar="FILE", help="file of questions, one per line or JSON lines; - for stdin")
+    parser.add_argument("--output", default="answers.jsonl", help="JSONL file the batch answers are appended to")
+    parser.add_argument("--concurrency", type=int, default=8, help="batch requests in flight at once")
+    parser.add_argument("--tokens-per-minute", type=int, default=0,
+                        help="limit on estimated input plus max output tokens sent per minute (0 for none)")
+    parser.add_argument("--max-retries", type=int, default=5, help="retries of a rate-limited or failed batch request")
+    parser.add_argument("--model", default="claude-3-sonnet-20240229")
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--temperature", type=float, default=0.5)
+    parser.add_argument("--no-cache", action="store_true", help="send the question even if its answer is cached")
+    args = parser.parse_args(argv)
+
+    # Repeated questions are answered from the response cache
+    cache = open_cache()
+
+    if args.batch is None:
+        print(run(build_provider(args, cache).send(args.question)).text)
+        return 0
+
+    questions = read_questions(args.batch)
+    done = answered_ids(args.output)
+    remaining = [(qid, question) for qid, question in questions if qid not in done]
+    if len(remaining) < len(questions):
+        print(f"[✓] Resuming: {len(questions) - len(remaining)} of {len(questions)} questions already answered in {args.output}")
+    if not remaining:
+        return 0
+    start = time.perf_counter()
+    try:
+        counts = run(run_batch(remaining, args, cache))
+    except KeyboardInterrupt:
+        print(f"[!] Interrupted; run the same command again to resume from {args.output}")
+        return 130
+    print(f"[✓] {counts['ok']} answered, {counts['error']} failed in {time.perf_counter() - start:.1f} s: {args.output}")
+    if counts["error"]:
+        print("[!] Run the same command again to retry the failed questions")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
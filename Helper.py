@@ -1,6 +1,11 @@
 import os
+import glob
 import openai
 import json
+import time
+from httpClients import openai_client
+from assistantTools import open_session, recover_session, upload_files
+from chatProviders import AssistantsProvider, run
 
 class OpenAIChatbot:
     def __init__(self, config_file="config.json"):
@@ -19,37 +24,52 @@ class OpenAIChatbot:
             exit(1)
 
         # Initialize client
-        self.client = openai.OpenAI()
+        self.client = openai_client()
 
-        # Create an Assistant with file search enabled
-        self.assistant = self.client.beta.assistants.create(
-            model=self.model,
-            instructions=self.instructions,
-            name=self.name,
-            tools=[{"type": "file_search"}]
+        # Reuse the Assistant (file search enabled) created for this configuration,
+        # or create it, and start or resume a Thread
+        start = time.perf_counter()
+        tools = [{"type": "file_search"}]
+        self.assistant, self.thread, self.session_notes = open_session(
+            self.client,
+            self.instructions,
+            self.model,
+            self.name,
+            tools=tools,
+            resume_thread=config.get('resume_thread', False)
         )
+        # Prompts and answers go through the async provider, which only fetches newer messages
+        # and replaces a stored assistant or thread deleted on the OpenAI side when first used
+        self.provider = AssistantsProvider(
+            self.assistant.id, self.thread.id,
+            recover=lambda missing: recover_session(self.client, missing, self.instructions, self.model,
+                                                    self.name, tools)
+        )
+        self.startup_seconds = time.perf_counter() - start
 
-        # Create a Thread
-        self.thread = self.client.beta.threads.create()
+    def upload_files(self, file_paths):
+        """Uploads files to the OpenAI API, skipping content uploaded before.
 
-    def upload_file(self, file_path):
-        """Uploads a file to the OpenAI API."""
-        try:
-            with open(file_path, 'rb') as file_data:
-                file_object = self.client.files.create(
-                    file=file_data,
-                    purpose='assistants'
-                )
-            print(f"File uploaded successfully: ID {file_object.id}")
-            return file_object.id
-        except Exception as e:
-            print(f"Failed to upload file: {e}")
-            return None
+        Returns the distinct IDs of the files that are available.
+        """
+        file_ids = []
+        for file_path, (file_id, detail) in upload_files(self.client, file_paths).items():
+            if file_id is None:
+                print(f"Failed to upload file {file_path}: {detail}")
+            elif detail:
+                print(f"File already uploaded: {file_path} (ID {file_id})")
+                file_ids.append(file_id)
+            else:
+                print(f"File uploaded successfully: {file_path} (ID {file_id})")
+                file_ids.append(file_id)
+        # Copies of one file share its ID and are attached once
+        return list(dict.fromkeys(file_ids))
 
     def run_chat(self):
         print("*****************   N E W   C H A T   *****************")
         print(f"Assistant: {self.assistant.id}")
         print(f"Thread: {self.thread.id}")
+        print(f"Startup: {self.startup_seconds * 1000:.0f} ms ({self.session_notes})")
 
         while True:
             print(">>>>>>>>>>>>>>>>>>>>>>>>>>")
@@ -58,56 +78,40 @@ class OpenAIChatbot:
                 break
             
             if user_input.startswith("file:"):
-                file_path = user_input[5:].strip()
-                file_id = self.upload_file(file_path)
-                if file_id:
-                    print(f"File ID {file_id} will be used in subsequent requests")
-                    # Attach the file to the thread
+                # One path or a glob such as file: notes/*.pdf
+                pattern = user_input[5:].strip()
+                file_paths = sorted(glob.glob(pattern)) or [pattern]
+                file_ids = self.upload_files(file_paths)
+                if file_ids:
+                    print(f"{len(file_ids)} file(s) will be used in subsequent requests")
+                    # Attach the files to the thread in one message
                     try: 
-                        message = self.client.beta.threads.messages.create(
-                            thread_id=self.thread.id,
-                            role="user",
-                            content="Query involving an uploaded file.",
-                            attachments=[{"file_id": file_id, "tools": [{"type": "file_search"}]}]
-                        )
-                        continue
+                        run(self.provider.add_message("Query involving uploaded files.", file_ids))
                     except Exception as e:
-                        print(f"Failed to upload file: {e}")
+                        print(f"Failed to attach files: {e}")
+                continue
 
             try:                         
-                # Add a Message to a Thread
-                my_thread_message = self.client.beta.threads.messages.create(
-                    thread_id=self.thread.id,
-                    role="user",
-                    content=user_input,
-                )
-
-                # Run the Assistant
-                my_run = self.client.beta.threads.runs.create(
-                    thread_id=self.thread.id,
-                    assistant_id=self.assistant.id
-                )
+                # Add the message to the Thread and run the Assistant, printing the answer
+                # as it streams in; Ctrl+C cancels the run
+                print("\n<<<<<<<<<<<<<<<<<<<<<<<<<<")
+                print("\n" + self.name + ": ", end="", flush=True)
+                streamed = []
+                def on_delta(text):
+                    streamed.append(text)
+                    print(text, end="", flush=True)
+                reply = run(self.provider.stream(user_input, on_delta=on_delta))
+                if reply.status != "completed":
+                    print(f"\nRun ended with status: {reply.status}")
+                elif not streamed:
+                    # Polled run: the answer was fetched from the thread
+                    print(reply.text)
+                else:
+                    print()
+            except KeyboardInterrupt:
+                print("\nRun ended with status: cancelled")
             except Exception as e:
                 print(f"Error: {e}")
-            
-            # Check the status of the run and output responses
-            while my_run.status in ["queued", "in_progress"]:
-                my_run = self.client.beta.threads.runs.retrieve(
-                    thread_id=self.thread.id,
-                    run_id=my_run.id
-                )
-                if my_run.status == "completed":
-                    all_messages = self.client.beta.threads.messages.list(
-                        thread_id=self.thread.id
-                    )
-                    for message in all_messages.data:
-                        if message.role == "assistant":
-                            print("\n<<<<<<<<<<<<<<<<<<<<<<<<<<")
-                            print("\n" + self.name + f": {message.content[0].text.value}")
-                            break
-                    break
-                else:
-                    print(".", end="", flush=True)
 
 if __name__ == "__main__":
     pepito = OpenAIChatbot()
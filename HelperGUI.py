@@ -1,49 +1,53 @@
 import os
 import openai
 import json
-from PyQt5.QtWidgets import QApplication, QWidget, QTextEdit, QLineEdit, QVBoxLayout, QPushButton
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl
+import time
+from httpClients import openai_client
+from assistantTools import open_session, recover_session, upload_files
+from chatProviders import AssistantsProvider, run
+from requestQueue import RequestQueue
+from transcriptView import TranscriptView
+from PyQt5.QtWidgets import QApplication, QWidget, QLineEdit, QVBoxLayout, QPushButton
+from PyQt5.QtCore import Qt, QTimer, QUrl
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QClipboard
 
-class LLMWorker(QThread):
-    result_ready = pyqtSignal(str)  # Signal to emit when the result is ready
+# Interval at which streamed text is flushed into the text area (milliseconds)
+STREAM_FLUSH_MS = 50
 
-    def __init__(self, user_input, openai_client, assistant_openai, thread_openai):
-        super().__init__()
-        self.user_input = user_input
-        self.openai_client = openai_client
-        self.assistant_openai = assistant_openai
-        self.thread_openai = thread_openai
+# Send one prompt to the assistant from a worker thread, streaming the answer through request
+def ask_assistant(request, user_input, provider):
+    if request.is_cancelled():
+        # Cancelled as the worker picked it up
+        return ""
+    reply = run(provider.stream(user_input, on_delta=request.emit_delta))
+    if reply.status == "completed" and reply.text:
+        return reply.text
+    elif reply.status == "cancelled":
+        return reply.text
+    return "Error: No response from the assistant."
 
-    def run(self):
-        # Send the request to OpenAI
+# Upload files and attach them to the thread in one message; returns the lines to display
+def upload_and_attach(request, openai_client, provider, file_paths):
+    # Upload concurrently, skipping content uploaded before, then attach everything in one message
+    lines = []
+    file_ids = []
+    for file_path, (file_id, detail) in upload_files(openai_client, file_paths).items():
+        if file_id is None:
+            lines.append(f"Failed to upload file {file_path}: {detail}")
+        elif detail:
+            lines.append(f"File already uploaded: {file_path} (ID {file_id})")
+            file_ids.append(file_id)
+        else:
+            lines.append(f"File uploaded successfully: {file_path} (ID {file_id})")
+            file_ids.append(file_id)
+    # Copies of one file share its ID and are attached once
+    file_ids = list(dict.fromkeys(file_ids))
+    if file_ids:
         try:
-            # Send user input to OpenAI
-            thread_message = self.openai_client.beta.threads.messages.create(
-                thread_id=self.thread_openai.id,
-                role="user",
-                content=self.user_input,
-            )
-            run_openai = self.openai_client.beta.threads.runs.create(
-                thread_id=self.thread_openai.id,
-                assistant_id=self.assistant_openai.id
-            )
-            while run_openai.status in ["queued", "in_progress"]:
-                run_openai = self.openai_client.beta.threads.runs.retrieve(
-                    thread_id=self.thread_openai.id,
-                    run_id=run_openai.id
-                )
-                if run_openai.status == "completed":
-                    all_messages = self.openai_client.beta.threads.messages.list(
-                        thread_id=self.thread_openai.id
-                    )
-                    for message in all_messages.data:
-                        if message.role == "assistant":
-                            self.result_ready.emit(message.content[0].text.value)
-                            return
-            self.result_ready.emit("Error: No response from the assistant.")
+            run(provider.add_message("Files uploaded.", file_ids))
         except Exception as e:
-            self.result_ready.emit(f"Error: {e}")
+            lines.append(f"Failed to attach files to thread: {e}")
+    return lines
 
 class OpenAIChatbot(QWidget):
     def __init__(self):
@@ -58,22 +62,42 @@ class OpenAIChatbot(QWidget):
         self.model = config['model']
         self.name = config['name']
         self.latest_response = ""  # Store the latest AI response
+        self.pending_deltas = []  # Streamed text not yet shown
+        self.streamed_text = ""  # Streamed text of the current answer shown so far
+        self.requests = {}  # request ID -> ("prompt", text) or ("upload", paths), until shown
 
         openai.api_key = os.getenv("OPENAI_API_KEY")
         if not openai.api_key:
             print("API key is not set. Please set the OPENAI_API_KEY environment variable.")
             exit(1)
 
-        self.client = openai.OpenAI()
+        self.client = openai_client()
 
-        self.assistant = self.client.beta.assistants.create(
-            model=self.model,
-            instructions=self.instructions,
-            name=self.name,
-            tools=[{"type": "file_search"}]
+        start = time.perf_counter()
+        tools = [{"type": "file_search"}]
+        self.assistant, self.thread, self.session_notes = open_session(
+            self.client,
+            self.instructions,
+            self.model,
+            self.name,
+            tools=tools,
+            resume_thread=config.get('resume_thread', False)
         )
+        # Prompts and answers go through the async provider, which only fetches newer messages
+        # and replaces a stored assistant or thread deleted on the OpenAI side when first used
+        self.provider = AssistantsProvider(
+            self.assistant.id, self.thread.id,
+            recover=lambda missing: recover_session(self.client, missing, self.instructions, self.model,
+                                                    self.name, tools)
+        )
+        self.startup_seconds = time.perf_counter() - start
 
-        self.thread = self.client.beta.threads.create()
+        # Prompts and uploads share one worker so they reach the thread in order
+        self.chat_queue = RequestQueue(workers=1, parent=self)
+        self.chat_queue.started.connect(self.on_request_started)
+        self.chat_queue.delta_ready.connect(self.queue_delta)
+        self.chat_queue.result_ready.connect(self.display_results)
+        self.chat_queue.pending_changed.connect(self.update_status)
 
         # Initialize GUI
         self.init_gui()
@@ -86,13 +110,14 @@ class OpenAIChatbot(QWidget):
         layout = QVBoxLayout()
 
         # Create text area for displaying messages
-        self.text_area = QTextEdit(self)
-        self.text_area.setReadOnly(True)
+        # Only the messages in view are drawn, so long sessions stay responsive
+        self.text_area = TranscriptView(self)
         layout.addWidget(self.text_area)
 
         # Display assistant and thread IDs
         self.text_area.append(f"Assistant ID: {self.assistant.id}")
         self.text_area.append(f"Thread ID: {self.thread.id}")
+        self.text_area.append(f"Startup: {self.startup_seconds * 1000:.0f} ms ({self.session_notes})")
 
         # Input area for user messages
         self.user_input = QLineEdit(self)
@@ -104,9 +129,20 @@ class OpenAIChatbot(QWidget):
         self.copy_button.clicked.connect(self.copy_latest_answer)
         layout.addWidget(self.copy_button)
 
+        # Button for cancelling the running and queued requests
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_requests)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
         # Connect Enter key to input processing
         self.user_input.returnPressed.connect(self.on_enter_pressed)
 
+        # Coalesce streamed deltas into one text area update per interval
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_MS)
+        self.stream_timer.timeout.connect(self.flush_deltas)
+
         # Set layout
         self.setLayout(layout)
 
@@ -117,32 +153,13 @@ class OpenAIChatbot(QWidget):
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
-        urls = event.mimeData().urls()
-        if urls:
-            file_path = urls[0].toLocalFile()
-            self.upload_file(file_path)
+        file_paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if file_paths:
+            self.upload_files(file_paths)
 
-    def upload_file(self, file_path):
-        try:
-            with open(file_path, 'rb') as file_data:
-                file_object = self.client.files.create(
-                    file=file_data,
-                    purpose='assistants'
-                )
-            self.text_area.append(f"File uploaded successfully: ID {file_object.id}")
-            # Attach the file to the thread
-            try:
-                self.client.beta.threads.messages.create(
-                    thread_id=self.thread.id,
-                    role="user",
-                    content="File uploaded.",
-                    attachments=[{"file_id": file_object.id, "tools": [{"type": "file_search"}]}]
-                )
-            except Exception as e:
-                self.text_area.append(f"Failed to attach file to thread: {e}")
-            self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
-        except Exception as e:
-            self.text_area.append(f"Failed to upload file: {e}")
+    def upload_files(self, file_paths):
+        request_id = self.chat_queue.submit(upload_and_attach, self.client, self.provider, file_paths)
+        self.requests[request_id] = ("upload", file_paths)
 
     def on_enter_pressed(self):
         user_input = self.user_input.text().strip()
@@ -151,32 +168,93 @@ class OpenAIChatbot(QWidget):
         self.user_input.clear()
 
     def process_user_input(self, user_input):
-        self.text_area.append(f"Juan: {user_input}")
+        # The input stays enabled: prompts typed while a run is active are queued
+        request_id = self.chat_queue.submit(ask_assistant, user_input, self.provider)
+        self.requests[request_id] = ("prompt", user_input)
+        if self.chat_queue.pending() > 1:
+            self.text_area.append(f"Queued: {user_input[:80]}")
+
+    def on_request_started(self, request_id):
+        kind, detail = self.requests[request_id]
+        if kind == "upload":
+            self.text_area.append(f"Uploading {len(detail)} file(s)...")
+            return
+        self.text_area.append(f"Juan: {detail}")
         self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
+        self.request_started = time.perf_counter()
+        self.first_token_seconds = None
+        self.streamed_text = ""
 
-        # Disable the input field during processing
-        self.user_input.setEnabled(False)
+    def cancel_requests(self):
+        self.chat_queue.cancel()
+        self.provider.cancel()
 
-        # Start the worker thread
-        self.worker_thread = LLMWorker(
-            user_input, self.client, self.assistant, self.thread
-        )
-        self.worker_thread.result_ready.connect(self.display_results)
-        self.worker_thread.start()
+    def update_status(self, pending):
+        self.cancel_button.setEnabled(pending > 0)
+        status = f" ({pending} pending)" if pending else ""
+        self.user_input.setPlaceholderText("Type your message and press Enter" + status)
+
+    def queue_delta(self, request_id, text):
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.request_started
+        self.pending_deltas.append(text)
+        if not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_deltas(self):
+        if not self.pending_deltas:
+            self.stream_timer.stop()
+            return
+        if not self.streamed_text:
+            self.text_area.append(f"{self.name}: ")
+        text = "".join(self.pending_deltas)
+        self.streamed_text += text
+        self.text_area.extend_last(text)
+        self.pending_deltas = []
 
-    def display_results(self, response):
+    def display_results(self, request_id, response, cancelled):
+        kind, detail = self.requests.pop(request_id)
+        if cancelled and response is None:
+            # Cancelled before it started; an upload's detail is its list of files
+            if kind == "upload":
+                self.text_area.append(f"Upload of {len(detail)} file(s) cancelled.")
+            else:
+                self.text_area.append(f"Cancelled: {detail[:80]}")
+            return
+        if kind == "upload":
+            if isinstance(response, Exception):
+                response = [f"Failed to upload files: {response}"]
+            for line in response:
+                self.text_area.append(line)
+            self.text_area.append(">>>>>>>>>>>>>>>>>>>>>>>>>>")
+            return
+
+        self.flush_deltas()
+        self.stream_timer.stop()
+        if isinstance(response, Exception):
+            response = f"Error: {response}"
         self.latest_response = response  # Store the latest AI response
-        self.text_area.append(f"{self.name}: {response}")
+        if response != self.streamed_text:
+            # Not streamed, or the stream was cut short by an error
+            self.text_area.append(f"{self.name}: {response}")
+        if cancelled:
+            self.text_area.append("(cancelled)")
+        total_seconds = time.perf_counter() - self.request_started
+        if self.first_token_seconds is not None:
+            self.text_area.append(f"(first token {self.first_token_seconds * 1000:.0f} ms, total {total_seconds:.1f} s)")
         self.text_area.append("<<<<<<<<<<<<<<<<<<<<<<<<<<")
 
-        # Re-enable the input field after processing is done
-        self.user_input.setEnabled(True)
-
     def copy_latest_answer(self):
         clipboard = QApplication.clipboard()
         clipboard.setText(self.latest_response)
         self.text_area.append("Latest answer copied to clipboard.")
 
+    def closeEvent(self, event):
+        # Cancel the active run and wait for the worker before the window goes away
+        self.provider.cancel()
+        self.chat_queue.shutdown()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication([])
     chatbot = OpenAIChatbot()
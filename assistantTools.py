@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import openai
+from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pdfText import file_digest
+from llmMetrics import span
+
+# Helpers shared by Helper.py and HelperGUI.py for the OpenAI Assistants API: the
+# registries of assistants, threads and uploaded files. Runs go through
+# chatProviders.AssistantsProvider.
+
+# Local registry of assistants and threads created by Helper.py and HelperGUI.py
+REGISTRY_PATH = "assistant_registry.json"
+
+# Local record of files already uploaded, keyed by account and content hash
+UPLOADS_PATH = "uploaded_files.json"
+
+# Maximum number of files uploaded at the same time
+UPLOAD_WORKERS = 4
+
+# Stand-in for an assistant or thread object when only its ID is known locally
+Reference = namedtuple("Reference", ["id"])
+
+def account_key(client):
+    """Hash of the endpoint and API key of client; IDs stored for one account are not used with another."""
+    account = f"{client.base_url}\n{client.api_key}"
+    return hashlib.sha256(account.encode('utf-8')).hexdigest()[:16]
+
+def config_key(instructions, model, name, tools, account=""):
+    """Hash of the settings an assistant is created with, on the account given by account_key."""
+    settings = json.dumps([instructions, model, name, tools, account], sort_keys=True)
+    return hashlib.sha256(settings.encode('utf-8')).hexdigest()
+
+def _load_registry(registry_path):
+    try:
+        with open(registry_path, 'r', encoding='utf-8') as registry_file:
+            return json.load(registry_file)
+    except (OSError, ValueError):
+        return {}
+
+def _save_registry(registry, registry_path):
+    try:
+        temp_path = registry_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as registry_file:
+            json.dump(registry, registry_file, indent=2)
+        os.replace(temp_path, registry_path)
+    except OSError as e:
+        print(f"Failed to update assistant registry: {e}")
+
+def _create_assistant(client, instructions, model, name, tools):
+    with span("openai", "assistants.create", model):
+        return client.beta.assistants.create(
+            model=model,
+            instructions=instructions,
+            name=name,
+            tools=tools
+        )
+
+def _create_thread(client):
+    with span("openai", "threads.create"):
+        return client.beta.threads.create()
+
+def open_session(client, instructions, model, name, tools, resume_thread=False, registry_path=REGISTRY_PATH):
+    """Return (assistant, thread, description) for the given configuration.
+
+    An assistant created earlier with identical instructions, model, name and
+    tools on the same endpoint and API key is reused from the local registry
+    without any request; a new one is only created when the configuration
+    changes. With resume_thread the last thread of that assistant is resumed
+    as well, otherwise a new thread is started. Reused objects are Reference
+    tuples that only carry the ID; if one no longer exists on the OpenAI side,
+    recover_session replaces it when it is first used.
+    """
+    registry = _load_registry(registry_path)
+    key = config_key(instructions, model, name, tools, account_key(client))
+    entry = registry.get(key, {})
+    notes = []
+    if entry.get("assistant_id"):
+        assistant = Reference(entry["assistant_id"])
+        notes.append("assistant reused")
+    else:
+        assistant = _create_assistant(client, instructions, model, name, tools)
+        entry = {"assistant_id": assistant.id, "model": model, "name": name}
+        notes.append("assistant created")
+
+    if resume_thread and entry.get("thread_id"):
+        thread = Reference(entry["thread_id"])
+        notes.append("thread resumed")
+    else:
+        thread = _create_thread(client)
+        notes.append("thread created")
+
+    entry["thread_id"] = thread.id
+    entry["used"] = datetime.now().isoformat(timespec="seconds")
+    registry[key] = entry
+    _save_registry(registry, registry_path)
+    return assistant, thread, ", ".join(notes)
+
+def recover_session(client, missing, instructions, model, name, tools, registry_path=REGISTRY_PATH):
+    """Replace a stored assistant or thread that the API reports as not found.
+
+    missing is "assistant" or "thread". A new one is created for the given
+    configuration, the registry entry is rewritten, and the new ID returned.
+    Used by chatProviders.AssistantsProvider through its recover callback.
+    """
+    registry = _load_registry(registry_path)
+    key = config_key(instructions, model, name, tools, account_key(client))
+    entry = registry.get(key, {})
+    if missing == "assistant":
+        new_id = _create_assistant(client, instructions, model, name, tools).id
+        entry.update(assistant_id=new_id, model=model, name=name)
+    else:
+        new_id = _create_thread(client).id
+        entry["thread_id"] = new_id
+    print(f"Stored {missing} not found on the server; created {new_id}")
+    entry["used"] = datetime.now().isoformat(timespec="seconds")
+    registry[key] = entry
+    _save_registry(registry, registry_path)
+    return new_id
+
+def upload_files(client, file_paths, uploads_path=UPLOADS_PATH, workers=UPLOAD_WORKERS):
+    """Upload files for the assistants and return {path: (file_id, reused)}.
+
+    Files are identified by content hash and account: a file uploaded before
+    with the same endpoint and API key, or a copy of one, is referenced by its
+    existing file ID after a lookup instead of being sent again, and uploaded
+    again if that file no longer exists. Lookups and uploads run concurrently
+    in up to workers threads. A path that cannot be read or uploaded maps to
+    (None, error message).
+    """
+    try:
+        with open(uploads_path, 'r', encoding='utf-8') as uploads_file:
+            uploads = json.load(uploads_file)
+    except (OSError, ValueError):
+        uploads = {}
+
+    account = account_key(client)
+    results = {}
+    pending = {}  # upload key -> paths with that content
+    for file_path in file_paths:
+        try:
+            key = f"{account}:{file_digest(file_path)}"
+        except OSError as e:
+            results[file_path] = (None, str(e))
+            continue
+        pending.setdefault(key, []).append(file_path)
+
+    def upload(file_path):
+        with span("openai", "files.create", bytes=os.path.getsize(file_path)):
+            with open(file_path, 'rb') as file_data:
+                return client.files.create(file=file_data, purpose='assistants').id
+
+    def reuse_or_upload(key, file_path):
+        if key in uploads:
+            try:
+                with span("openai", "files.retrieve"):
+                    return client.files.retrieve(uploads[key]["file_id"]).id, True
+            except openai.NotFoundError:
+                pass  # Deleted on the OpenAI side
+        return upload(file_path), False
+
+    if pending:
+        uploaded = False
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {key: executor.submit(reuse_or_upload, key, paths[0]) for key, paths in pending.items()}
+            for key, future in futures.items():
+                try:
+                    outcome = future.result()
+                    if not outcome[1]:
+                        uploads[key] = {"file_id": outcome[0], "name": os.path.basename(pending[key][0])}
+                        uploaded = True
+                except Exception as e:
+                    outcome = (None, str(e))
+                for file_path in pending[key]:
+                    results[file_path] = outcome
+
+        if uploaded:
+            try:
+                temp_path = uploads_path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as uploads_file:
+                    json.dump(uploads, uploads_file, indent=2)
+                os.replace(temp_path, uploads_path)
+            except OSError as e:
+                print(f"Failed to update upload registry: {e}")
+    return {file_path: results[file_path] for file_path in file_paths}
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime
+from benchmarkSummaries import WORDS
+from loadTest import _Request, start_mock_server
+
+# Benchmark of the documentIndex.py retrieval stage against sending the full text.
+# A synthetic document of --pages pages is split into sections, each about one
+# made-up topic term. A session of --questions questions, each about one topic, is
+# then sent through ClaudeGUI.ask_claude twice: once with the whole document
+# attached (the conversation budget shortens it as needed) and once with only the
+# passages retrieved for each question. Requests go to an in-process mockServer.py
+# whose --prefill-delay makes latency grow with the prompt, so no API key is needed:
+#   python benchmarkRetrieval.py --pages 300 --questions 10 --prefill-delay 0.05
+#   python benchmarkRetrieval.py --pdf notes.pdf --question "What is a Markov chain?"
+
+def topic(section):
+    return f"topic{section:04d}"
+
+def build_document(pages, words_per_page, section_pages, seed):
+    """Page texts of a synthetic document; section n covers section_pages pages about topic(n)."""
+    rnd = random.Random(seed)
+    document = []
+    for page in range(pages):
+        words = [rnd.choice(WORDS) for _ in range(words_per_page)]
+        for position in range(0, words_per_page, 40):
+            words[position] = topic(page // section_pages)
+        document.append(" ".join(words))
+    return document
+
+def run_session(mode, pages, questions, args):
+    """Send questions in one conversation; returns per-question measurements."""
+    from chatProviders import AnthropicProvider
+    from ClaudeGUI import ask_claude
+    from documentIndex import DocumentIndex
+    from conversationContext import ConversationContext
+
+    context = ConversationContext(prompt_caching=not args.no_cache)
+    provider = AnthropicProvider("claude-3-opus-20240229", context=context)
+    index = None
+    if mode == "full":
+        text = "\n".join(pages)
+        ask_claude(_Request(), f"I've uploaded a PDF file. Here's the content:\n\n{text}\n\nPlease analyze this PDF content.",
+                   provider, True)
+    else:
+        index = DocumentIndex()
+        index.add_document("benchmark.pdf", pages)
+
+    results = []
+    for question, expected in questions:
+        # Document text the question goes out with: the conversation so far and its passages
+        sent = "\n".join(message["content"] for message in context.request_messages())
+        if index is not None:
+            sent += index.passages(question)
+        request = _Request()
+        start = time.perf_counter()
+        ask_claude(request, question, provider, False, index)
+        end = time.perf_counter()
+        usage = provider.last_reply.metrics or {}
+        results.append({
+            "latency": end - start,
+            "ttft": None if request.first_delta is None else request.first_delta - start,
+            "prompt_tokens": sum(usage.get(field) or 0 for field in
+                                 ("input_tokens", "cache_read_tokens", "cache_write_tokens")),
+            "uncached_tokens": usage.get("input_tokens") or 0,
+            "answer_in_prompt": None if expected is None else expected in sent,
+        })
+    return results
+
+def summarize(results):
+    from llmMetrics import percentile
+
+    def ms(values, fraction):
+        values = sorted(value for value in values if value is not None)
+        return None if not values else round(percentile(values, fraction) * 1000, 1)
+
+    found = [result["answer_in_prompt"] for result in results if result["answer_in_prompt"] is not None]
+    return {
+        "prompt_tokens_per_question": round(sum(result["prompt_tokens"] for result in results) / len(results)),
+        "uncached_tokens_per_question": round(sum(result["uncached_tokens"] for result in results) / len(results)),
+        "latency_ms_p50": ms([result["latency"] for result in results], 0.5),
+        "latency_ms_p95": ms([result["latency"] for result in results], 0.95),
+        "ttft_ms_p50": ms([result["ttft"] for result in results], 0.5),
+        "answer_in_prompt": None if not found else round(sum(found) / len(found), 2),
+    }
+
+def run_benchmark(args):
+    from pdfText import iter_pdf_pages
+    from documentIndex import DocumentIndex
+
+    if args.pdf:
+        pages = list(iter_pdf_pages(args.pdf))
+        questions = [(question, None) for question in args.question] or [("Summarize the main results.", None)]
+    else:
+        pages = build_document(args.pages, args.words_per_page, args.section_pages, args.seed)
+        sections = (args.pages + args.section_pages - 1) // args.section_pages
+        rnd = random.Random(args.seed)
+        questions = [(f"What does the document say about {topic(section)}?", topic(section))
+                     for section in (rnd.randrange(sections) for _ in range(args.questions))]
+
+    # Search speed on its own, without the provider round trip
+    index = DocumentIndex()
+    start = time.perf_counter()
+    index.add_document("benchmark.pdf", pages)
+    index_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for question, expected in questions:
+        index.passages(question)
+    search_ms = (time.perf_counter() - start) / len(questions) * 1000
+
+    server = start_mock_server(args)
+    try:
+        modes = {}
+        for mode in ("full", "retrieval"):
+            modes[mode] = summarize(run_session(mode, pages, questions, args))
+    finally:
+        server.shutdown()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {"pdf": args.pdf, "pages": len(pages), "questions": len(questions),
+                     "prefill_delay": args.prefill_delay, "latency": args.latency,
+                     "token_delay": args.token_delay, "no_cache": args.no_cache, "seed": args.seed},
+        "chunks": len(index),
+        "index_seconds": round(index_seconds, 3),
+        "search_ms": round(search_ms, 2),
+        "modes": modes,
+    }
+
+def print_report(result):
+    print("==============================")
+    print(f"{'document':>28}: {result['settings']['pages']} pages, {result['chunks']} chunks "
+          f"indexed in {result['index_seconds']} s, {result['search_ms']} ms per search")
+    for name in ("prompt_tokens_per_question", "uncached_tokens_per_question", "latency_ms_p50",
+                 "latency_ms_p95", "ttft_ms_p50", "answer_in_prompt"):
+        full = result["modes"]["full"][name]
+        retrieval = result["modes"]["retrieval"][name]
+        line = f"{name:>28}: full text {full}, retrieval {retrieval}"
+        if full and retrieval is not None and name != "answer_in_prompt":
+            line += f"  ({(retrieval - full) / full * 100:+.1f}%)"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare sending retrieved passages with sending the full document.")
+    parser.add_argument("--pdf", help="benchmark this PDF instead of a synthetic document")
+    parser.add_argument("--question", action="append", default=[], help="question about --pdf (repeatable)")
+    parser.add_argument("--pages", type=int, default=300, help="pages of the synthetic document")
+    parser.add_argument("--words-per-page", type=int, default=400, help="words per synthetic page")
+    parser.add_argument("--section-pages", type=int, default=5, help="pages per synthetic topic")
+    parser.add_argument("--questions", type=int, default=10, help="questions in the session")
+    parser.add_argument("--no-cache", action="store_true", help="send without prompt caching")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic text")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    mock = parser.add_argument_group("in-process mock server")
+    mock.add_argument("--latency", type=float, default=0.1, help="seconds before each response starts")
+    mock.add_argument("--token-delay", type=float, default=0.005, help="seconds per generated token")
+    mock.add_argument("--tokens", type=int, default=40, help="tokens in every answer")
+    mock.add_argument("--prefill-delay", type=float, default=0.05,
+                      help="seconds per 1000 prompt tokens not read from the cache")
+    # No injected failures, so both modes answer every question
+    parser.set_defaults(error_rate=0.0, drop_rate=0.0)
+    args = parser.parse_args(argv)
+
+    # Keep benchmark calls out of the metrics file
+    os.environ.setdefault("LLM_METRICS_PATH", "off")
+    result = run_benchmark(args)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+        print(f"[✓] Results written to: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
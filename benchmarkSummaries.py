@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import platform
+from datetime import datetime
+
+# Offline benchmark for the generateSummaries.py pipeline.
+# Builds a synthetic corpus of PDFs under a temporary OPUS_MATERIALS-style tree,
+# runs the pipeline on it and reports extraction time, summarization time, peak
+# RSS and end-to-end throughput. Results are saved as JSON so runs can be compared:
+#   python benchmarkSummaries.py --pdfs 40 --workers 4 --output bench.json
+#   python benchmarkSummaries.py --pdfs 40 --workers 4 --compare bench.json
+
+WORDS = (
+    "the a of model cell growth rate population data analysis matrix system equation "
+    "linear function value network signal vector space probability estimate error "
+    "measure theory sample variance mean regression gradient operator boundary"
+).split()
+
+# Write a minimal single-font PDF with one line of text per sentence
+def write_pdf(pdf_path, pages, rnd, lines_per_page=40):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = []
+        for line in range(lines_per_page):
+            words = [rnd.choice(WORDS) for _ in range(rnd.randint(6, 14))]
+            sentence = " ".join(words).capitalize() + "."
+            lines.append(f"BT /F1 9 Tf 40 {760 - line * 18} Td ({sentence}) Tj ET")
+        stream = "\n".join(lines).encode("latin-1")
+        page_id = len(objects) + 1
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>").encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(page_id)
+    objects[1] = (f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] "
+                  f"/Count {pages} >>").encode()
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(pdf_path, 'wb') as file:
+        file.write(data)
+
+def build_corpus(root, pdf_count, units, page_counts, seed):
+    """Create units folders "U<n> Unit" holding pdf_count PDFs in total; returns the page total."""
+    rnd = random.Random(seed)
+    materials = os.path.join(root, "Units")
+    total_pages = 0
+    for index in range(pdf_count):
+        unit = os.path.join(materials, f"U{index % units + 1} Unit")
+        os.makedirs(unit, exist_ok=True)
+        pages = page_counts[index % len(page_counts)]
+        write_pdf(os.path.join(unit, f"document_{index:04d}.pdf"), pages, rnd)
+        total_pages += pages
+    with open(os.path.join(root, "opus_benchmark.json"), 'w') as template:
+        json.dump({"name": "benchmark", "knowledgeBase": []}, template)
+    return materials, total_pages
+
+# Peak resident set size in MB of this process and of its finished worker processes
+def peak_rss_mb():
+    try:
+        import resource
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+        return {"main": round(own, 1), "workers": round(children, 1)}
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return {"main": round(getattr(info, "peak_wset", info.rss) / 2 ** 20, 1), "workers": None}
+        except ImportError:
+            return {"main": None, "workers": None}
+
+def run_benchmark(args):
+    root = tempfile.mkdtemp(prefix="summaries_bench_")
+    # Private extraction cache so every run measures real PDF parsing
+    os.environ["PDF_TEXT_CACHE"] = os.path.join(root, "pdf_text_cache")
+    import pdfText
+    pdfText.PDF_TEXT_CACHE_DIR = os.environ["PDF_TEXT_CACHE"]
+    import generateSummaries
+
+    try:
+        start = time.perf_counter()
+        materials, total_pages = build_corpus(root, args.pdfs, args.units, args.pages, args.seed)
+        corpus_seconds = time.perf_counter() - start
+        print(f"[✓] Built {args.pdfs} PDFs ({total_pages} pages) in {corpus_seconds:.1f}s under {root}")
+
+        start = time.perf_counter()
+        generateSummaries.run(
+            materials_dir=materials,
+            opus_path=os.path.join(root, "opus_benchmark.json"),
+            opus="benchmark",
+            backend=args.backend,
+            workers=args.workers,
+            use_cache=False
+        )
+        wall_seconds = time.perf_counter() - start
+
+        # Per-file timings written by the pipeline
+        extract_seconds = summarize_seconds = 0.0
+        failures = 0
+        with open(os.path.join(root, "log.jsonl"), 'r', encoding='utf-8') as events:
+            for line in events:
+                record = json.loads(line)
+                if record.get("event") != "pdf":
+                    continue
+                extract_seconds += record.get("extract_seconds") or 0.0
+                summarize_seconds += record.get("summarize_seconds") or 0.0
+                failures += not record.get("ok")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"pdfs": args.pdfs, "units": args.units, "pages": args.pages,
+                     "workers": args.workers, "backend": args.backend, "seed": args.seed},
+        "pages": total_pages,
+        "failures": failures,
+        "wall_seconds": round(wall_seconds, 3),
+        "extract_seconds": round(extract_seconds, 3),
+        "summarize_seconds": round(summarize_seconds, 3),
+        "pdfs_per_minute": round(args.pdfs / wall_seconds * 60, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+# Metrics compared between runs; for all of them lower is better except throughput
+COMPARED = ["wall_seconds", "extract_seconds", "summarize_seconds", "pdfs_per_minute"]
+
+def print_report(result, baseline=None):
+    print("==============================")
+    for name in COMPARED:
+        line = f"{name:>18}: {result[name]}"
+        if baseline and baseline.get(name):
+            change = (result[name] - baseline[name]) / baseline[name] * 100
+            line += f"  (baseline {baseline[name]}, {change:+.1f}%)"
+        print(line)
+    print(f"{'peak_rss_mb':>18}: {result['peak_rss_mb']}")
+    if result["failures"]:
+        print(f"[✗] {result['failures']} PDFs failed")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the generateSummaries.py pipeline on a synthetic corpus.")
+    parser.add_argument("--pdfs", type=int, default=24, help="number of PDFs to generate")
+    parser.add_argument("--units", type=int, default=3, help="number of unit folders")
+    parser.add_argument("--pages", type=lambda text: [int(n) for n in text.split(",")], default=[1, 5, 20, 60],
+                        help="comma-separated page counts cycled over the PDFs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--backend", choices=["sparse", "sumy"], default="sparse", help="TextRank engine")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic text")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary corpus and outputs")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+        print(f"[✓] Results written to: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from datetime import datetime
+from benchmarkSummaries import WORDS
+
+# Frame-time benchmark of the transcript widget used by ClaudeGUI.py and HelperGUI.py.
+# A long session is replayed into a QTextEdit (the previous widget) and into a
+# transcriptView.TranscriptView: each turn appends a prompt, sometimes with pasted PDF
+# text, streams an answer in deltas and appends the closing lines. Every update is
+# followed by a synchronous repaint, and its time is one frame. Frame times early
+# and late in the session show whether the cost grows with the session:
+#   python benchmarkTranscript.py --turns 400 --pdf-every 10
+#   python benchmarkTranscript.py --widget TranscriptView  (one widget per run for a clean peak RSS)
+#   set QT_QPA_PLATFORM=offscreen  (to run without a display)
+
+def text_edit_widget(parent):
+    from PyQt5.QtWidgets import QTextEdit
+    from PyQt5.QtGui import QTextCursor
+    widget = QTextEdit(parent)
+    widget.setReadOnly(True)
+
+    def extend_last(text):
+        cursor = widget.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        widget.ensureCursorVisible()
+    return widget, widget.append, extend_last
+
+def transcript_widget(parent):
+    from transcriptView import TranscriptView
+    widget = TranscriptView(parent)
+    return widget, widget.append, widget.extend_last
+
+WIDGETS = {"QTextEdit": text_edit_widget, "TranscriptView": transcript_widget}
+
+def replay(name, args):
+    """Frame times in ms of one replayed session, with the turn each frame belongs to."""
+    from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout
+    app = QApplication.instance() or QApplication([])
+    window = QWidget()
+    layout = QVBoxLayout(window)
+    widget, append, extend_last = WIDGETS[name](window)
+    layout.addWidget(widget)
+    window.resize(600, 400)
+    window.show()
+    app.processEvents()
+
+    rnd = random.Random(args.seed)
+    frames = []
+
+    def frame(turn, update, text):
+        start = time.perf_counter()
+        update(text)
+        widget.viewport().repaint()
+        app.processEvents()
+        frames.append((turn, (time.perf_counter() - start) * 1000))
+
+    for turn in range(args.turns):
+        prompt = " ".join(rnd.choice(WORDS) for _ in range(12))
+        if args.pdf_every and turn % args.pdf_every == 0:
+            prompt += "\n\n" + " ".join(rnd.choice(WORDS) for _ in range(args.pdf_chars // 7))
+        frame(turn, append, f"Juan: {prompt}")
+        frame(turn, append, ">>>>>>>>>>>>>>>>>>>>>>>>>>")
+        frame(turn, append, "Claude: ")
+        for _ in range(args.deltas):
+            frame(turn, extend_last, " ".join(rnd.choice(WORDS) for _ in range(8)) + " ")
+        frame(turn, append, "<<<<<<<<<<<<<<<<<<<<<<<<<<")
+    window.close()
+    return frames
+
+def summarize(frames, turns):
+    from llmMetrics import percentile
+    from benchmarkSummaries import peak_rss_mb
+
+    def stats(selected):
+        values = sorted(ms for turn, ms in selected)
+        return {"p50": round(percentile(values, 0.5), 2), "p95": round(percentile(values, 0.95), 2),
+                "max": round(values[-1], 2)}
+
+    tenth = max(1, turns // 10)
+    return {
+        "first_turns": stats([frame for frame in frames if frame[0] < tenth]),
+        "last_turns": stats([frame for frame in frames if frame[0] >= turns - tenth]),
+        "total_seconds": round(sum(ms for turn, ms in frames) / 1000, 2),
+        "peak_rss_mb": peak_rss_mb()["main"],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare transcript frame times of QTextEdit and TranscriptView.")
+    parser.add_argument("--turns", type=int, default=300, help="conversation turns replayed")
+    parser.add_argument("--deltas", type=int, default=20, help="streamed deltas per answer")
+    parser.add_argument("--pdf-every", type=int, default=10, help="paste PDF text into every n-th prompt (0 for never)")
+    parser.add_argument("--pdf-chars", type=int, default=30000, help="characters of pasted PDF text")
+    parser.add_argument("--widget", choices=sorted(WIDGETS), action="append", help="widget to replay (default both)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic text")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {"turns": args.turns, "deltas": args.deltas, "pdf_every": args.pdf_every,
+                     "pdf_chars": args.pdf_chars, "seed": args.seed},
+        "widgets": {},
+    }
+    print("==============================")
+    for name in args.widget or sorted(WIDGETS):
+        summary = summarize(replay(name, args), args.turns)
+        result["widgets"][name] = summary
+        first, last = summary["first_turns"], summary["last_turns"]
+        print(f"{name:>14}: frame ms p50/p95/max first 10% of turns {first['p50']} / {first['p95']} / {first['max']}, "
+              f"last 10% {last['p50']} / {last['p95']} / {last['max']} ({summary['total_seconds']} s in total, "
+              f"peak RSS {summary['peak_rss_mb']} MB)")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+        print(f"[✓] Results written to: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,531 @@
+import os
+import json
+import time
+import atexit
+import random
+import asyncio
+import threading
+import contextvars
+from collections import namedtuple
+from llmMetrics import span, last_record, acreate_message, langchain_callback
+from conversationContext import estimate_tokens
+
+# Async provider backend shared by the chat front-ends. Each adapter holds one
+# conversation with a provider and offers the same three operations:
+#   await provider.send(prompt)                  the whole answer as a Reply
+#   await provider.stream(prompt, on_delta)      on_delta(text) per piece as it arrives, then the Reply
+#   provider.cancel()                            stop the operations in progress (from any thread)
+# A cancelled operation returns what was received so far with status "cancelled",
+# and every operation gives up after LLM_TURN_TIMEOUT seconds, including streaming,
+# run polling and SDK retries. The command-line scripts and the Qt workers are
+# synchronous; they call run(coroutine), which executes the coroutine on one event
+# loop shared by the process, so requests of different windows and threads overlap.
+# Providers built without a client of their own share one connection pool on that loop.
+#
+# Adapters: AnthropicProvider (Messages API), AssistantsProvider (OpenAI Assistants)
+# and GroqProvider (ChatGroq through LangChain).
+
+# Seconds one send() or stream() may take in total
+TURN_TIMEOUT = float(os.environ.get("LLM_TURN_TIMEOUT", 600))
+
+# Answer of one operation; status is "completed", "cancelled", or the final status of
+# an Assistants run. metrics is the llmMetrics record of the provider call.
+Reply = namedtuple("Reply", ["text", "status", "model", "input_tokens", "output_tokens", "cached", "metrics"],
+                   defaults=(None, None, None, False, None))
+
+# Assistants run states in which the assistant is still working
+ACTIVE_RUN_STATES = ("queued", "in_progress", "cancelling")
+
+# Polling schedule of Assistants runs when streaming is not available (seconds)
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 8.0
+POLL_BACKOFF = 1.5
+
+_loop = None
+_loop_lock = threading.Lock()
+_http_client = None
+
+def event_loop():
+    """The event loop the providers run on, started on a daemon thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chatProviders", daemon=True).start()
+        return _loop
+
+def loop_http_client():
+    """The pooled httpx.AsyncClient shared by the providers on the event loop, closed at exit."""
+    global _http_client
+    event_loop()
+    with _loop_lock:
+        if _http_client is None:
+            from httpClients import async_http_client
+            _http_client = async_http_client()
+        return _http_client
+
+@atexit.register
+def _close_http_client():
+    if _http_client is not None and _loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(_http_client.aclose(), _loop).result(timeout=5)
+        except Exception:
+            pass
+
+def run(coroutine):
+    """Run coroutine on the provider event loop and return its result.
+
+    The coroutine sees the caller's llmMetrics context (e.g. queued_seconds).
+    Ctrl+C cancels it and is raised once the coroutine has cleaned up, e.g.
+    after an Assistants run has been cancelled on the server.
+    """
+    loop = event_loop()
+    done = threading.Event()
+    started = []
+
+    def start():
+        task = loop.create_task(coroutine)
+        task.add_done_callback(lambda task: done.set())
+        started.append(task)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    try:
+        # Short waits, because a blocking wait cannot be interrupted by Ctrl+C on Windows
+        while not done.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        while not started:
+            time.sleep(0.01)
+        loop.call_soon_threadsafe(started[0].cancel)
+        while not done.wait(0.1):
+            pass
+        raise
+    return started[0].result()
+
+class TokenRateLimiter:
+    """Token bucket holding at most tokens_per_minute tokens, refilled continuously.
+
+    Requests reserve their estimated tokens before they are sent and give back
+    the difference to their actual usage once answered.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.tokens = tokens_per_minute
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        # Waiters are served in order, so a large request is not starved by small ones
+        tokens = min(tokens, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def refund(self, tokens):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+class ChatProvider:
+    """One conversation with a provider; subclasses implement _send and _stream.
+
+    Both receive the prompt, a delta(text) callback and the keyword options of
+    send() or stream(), and return a Reply. They are cancelled with asyncio
+    task cancellation and should leave the conversation consistent when that
+    happens.
+    """
+
+    def __init__(self, model=None, timeout=TURN_TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+        self.last_reply = None
+        self._operations = {}  # task -> True once cancel() was called for it
+        self._lock = threading.Lock()
+
+    async def send(self, prompt, **options):
+        return await self._operation(self._send, prompt, None, options)
+
+    async def stream(self, prompt, on_delta=None, **options):
+        return await self._operation(self._stream, prompt, on_delta, options)
+
+    def cancel(self):
+        with self._lock:
+            tasks = list(self._operations)
+            for task in tasks:
+                self._operations[task] = True
+        for task in tasks:
+            task.get_loop().call_soon_threadsafe(self._cancel_task, task)
+
+    def _cancel_task(self, task):
+        # Runs on the task's loop; an operation that already finished is left alone
+        if task in self._operations:
+            task.cancel()
+
+    async def _operation(self, method, prompt, on_delta, options):
+        task = asyncio.current_task()
+        with self._lock:
+            self._operations[task] = False
+        received = []
+
+        def delta(text):
+            received.append(text)
+            if on_delta is not None:
+                on_delta(text)
+        try:
+            reply = await asyncio.wait_for(method(prompt, delta, **options), self.timeout)
+        except asyncio.CancelledError:
+            with self._lock:
+                cancelled = self._operations.get(task)
+            if not cancelled:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            reply = Reply("".join(received), "cancelled", self.model)
+        finally:
+            with self._lock:
+                self._operations.pop(task, None)
+        self.last_reply = reply
+        return reply
+
+    async def _send(self, prompt, delta, **options):
+        raise NotImplementedError
+
+    async def _stream(self, prompt, delta, **options):
+        raise NotImplementedError
+
+class AnthropicProvider(ChatProvider):
+    """Anthropic Messages API.
+
+    With a conversationContext.ConversationContext the prompts form one
+    conversation, sent within its token budget; attachment and later are
+    passed on to context.append(). Without one every prompt is sent on its
+    own. send() answers from a responseCache.ResponseCache when one is given
+    and waits for a TokenRateLimiter when one is given.
+    """
+
+    def __init__(self, model, client=None, max_tokens=1000, temperature=0.99, context=None,
+                 cache=None, bypass=False, limiter=None, timeout=TURN_TIMEOUT):
+        super().__init__(model, timeout)
+        if client is None:
+            from httpClients import async_anthropic_client
+            client = async_anthropic_client(http_client=loop_http_client(), api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        self.client = client
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.context = context
+        self.cache = cache
+        self.bypass = bypass
+        self.limiter = limiter
+
+    def _request(self, prompt, attachment=False, later=None):
+        if self.context is None:
+            messages = {"messages": [{"role": "user", "content": prompt}]}
+        else:
+            self.context.append("user", prompt, attachment=attachment, later=later)
+            messages = self.context.request_params()
+        return dict(model=self.model, max_tokens=self.max_tokens, temperature=self.temperature, **messages)
+
+    def _answered(self, text):
+        # Keep what was received so the conversation still alternates roles
+        if self.context is not None:
+            if text:
+                self.context.append("assistant", text)
+            else:
+                self.context.pop()
+
+    async def _reserve(self, request):
+        if self.limiter is None:
+            return 0
+        reserved = estimate_tokens(json.dumps([request.get("system"), request["messages"]])) + self.max_tokens
+        await self.limiter.acquire(reserved)
+        return reserved
+
+    def _settle(self, reserved, usage=None):
+        if self.limiter is not None:
+            used = 0 if usage is None else usage.input_tokens + usage.output_tokens
+            self.limiter.refund(reserved - used)
+
+    def _reply(self, message, cached=False):
+        text = "".join(block.text for block in message.content if getattr(block, "text", None))
+        self._answered(text)
+        return Reply(text, "completed", message.model, message.usage.input_tokens,
+                     message.usage.output_tokens, cached, last_record())
+
+    async def _send(self, prompt, delta, attachment=False, later=None):
+        from responseCache import cached_response, store_response
+        request = self._request(prompt, attachment, later)
+        try:
+            message = None
+            if self.cache is not None:
+                message = cached_response(self.cache, request, self.bypass)
+            if message is not None:
+                return self._reply(message, cached=True)
+            reserved = await self._reserve(request)
+            try:
+                message = await acreate_message(self.client, **request)
+            except BaseException:
+                self._settle(reserved)
+                raise
+            self._settle(reserved, message.usage)
+            if self.cache is not None:
+                store_response(self.cache, request, message)
+        except BaseException:
+            self._answered("")
+            raise
+        return self._reply(message)
+
+    async def _stream(self, prompt, delta, attachment=False, later=None):
+        request = self._request(prompt, attachment, later)
+        received = []
+        reserved = 0
+        try:
+            reserved = await self._reserve(request)
+            with span("anthropic", "messages.stream", self.model) as call:
+                try:
+                    async with self.client.messages.stream(**request) as stream:
+                        async for text in stream.text_stream:
+                            call.first_token()
+                            received.append(text)
+                            delta(text)
+                        message = await stream.get_final_message()
+                except asyncio.CancelledError:
+                    call.set(status="cancelled")
+                    raise
+                call.anthropic_usage(message.usage)
+        except BaseException:
+            self._settle(reserved)
+            self._answered("".join(received))
+            raise
+        self._settle(reserved, message.usage)
+        return self._reply(message)
+
+class AssistantsProvider(ChatProvider):
+    """OpenAI Assistants on one thread.
+
+    Each prompt is added to the thread and answered by a run of the assistant;
+    stream() streams the run and falls back to polling when streaming is not
+    available. A cancelled operation cancels its run and waits until the
+    thread accepts new runs again. The answer of a polled run is read back
+    from the thread, listing only the messages newer than the last one seen.
+
+    recover(missing) is called when the API reports the assistant or thread
+    as not found (e.g. an ID from a local registry that was deleted on the
+    server). missing is "assistant" or "thread", and it returns the ID of a
+    replacement; the failed step is then retried once. It runs on a worker
+    thread, e.g. assistantTools.recover_session with the sync client.
+    """
+
+    def __init__(self, assistant_id, thread_id, client=None, timeout=TURN_TIMEOUT, recover=None):
+        super().__init__(None, timeout)
+        if client is None:
+            from httpClients import async_openai_client
+            client = async_openai_client(http_client=loop_http_client())
+        self.client = client
+        self.assistant_id = assistant_id
+        self.thread_id = thread_id
+        self.recover = recover
+        self.last_message_id = None
+
+    async def add_message(self, content, file_ids=()):
+        """Add a user message to the thread, with the uploaded files attached for file search."""
+        import openai
+        try:
+            return await self._add_message(content, file_ids)
+        except openai.NotFoundError:
+            # A missing attachment is also reported as not found, so check the thread itself
+            if self.recover is None or not await self._thread_missing():
+                raise
+        self.thread_id = await asyncio.to_thread(self.recover, "thread")
+        self.last_message_id = None
+        return await self._add_message(content, file_ids)
+
+    async def _thread_missing(self):
+        import openai
+        try:
+            await self.client.beta.threads.retrieve(self.thread_id)
+        except openai.NotFoundError:
+            return True
+        return False
+
+    async def _add_message(self, content, file_ids):
+        params = {}
+        fields = {}
+        if file_ids:
+            params["attachments"] = [{"file_id": file_id, "tools": [{"type": "file_search"}]} for file_id in file_ids]
+            fields["files"] = len(file_ids)
+        with span("openai", "messages.create", **fields):
+            message = await self.client.beta.threads.messages.create(
+                thread_id=self.thread_id, role="user", content=content, **params)
+        self.last_message_id = message.id
+        return message
+
+    async def new_messages(self):
+        params = {"thread_id": self.thread_id, "order": "asc", "limit": 100}
+        if self.last_message_id:
+            params["after"] = self.last_message_id
+        with span("openai", "messages.list") as call:
+            # Iterating the paginator would request one more, empty page even when has_more is false
+            page = await self.client.beta.threads.messages.list(**params)
+            messages = list(page.data)
+            while page.data and getattr(page, "has_more", False):
+                page = await page.get_next_page()
+                messages.extend(page.data)
+            call.set(messages=len(messages))
+        if messages:
+            self.last_message_id = messages[-1].id
+        return messages
+
+    async def assistant_text(self, run_id):
+        parts = []
+        for message in await self.new_messages():
+            if message.role == "assistant" and message.run_id == run_id:
+                parts.extend(part.text.value for part in message.content if part.type == "text")
+        return "\n\n".join(parts)
+
+    async def _poll(self, run, polls):
+        # Exponential backoff with jitter: each wait is between half and all of the delay
+        delay = POLL_INITIAL_DELAY
+        while run.status in ACTIVE_RUN_STATES:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            run = await self.client.beta.threads.runs.retrieve(thread_id=self.thread_id, run_id=run.id)
+            delay = min(POLL_MAX_DELAY, delay * POLL_BACKOFF)
+            polls.append(run.status)
+        return run
+
+    async def _cancel_run(self, run_id):
+        import openai
+        try:
+            run = await self.client.beta.threads.runs.cancel(thread_id=self.thread_id, run_id=run_id)
+        except openai.OpenAIError:
+            # The run finished in the meantime
+            return
+        await self._poll(run, [])
+
+    async def _run(self, prompt, delta, stream, retry=True):
+        import openai
+        if retry:
+            await self.add_message(prompt)
+        missing_assistant = False
+        with span("openai", "assistants.run") as call:
+            polls = []
+            run = None
+            run_id = None
+            events = None
+            streamed = []
+            try:
+                if stream:
+                    try:
+                        async with self.client.beta.threads.runs.stream(
+                                thread_id=self.thread_id, assistant_id=self.assistant_id) as events:
+                            async for text in events.text_deltas:
+                                call.first_token()
+                                streamed.append(text)
+                                delta(text)
+                            run = await events.get_final_run()
+                    except (AttributeError, openai.BadRequestError) as e:
+                        if events is not None and events.current_run is not None:
+                            raise
+                        # Raised before a run exists, so falling back cannot start a second run
+                        print(f"Streaming unavailable, polling instead: {e}")
+                if run is None:
+                    run = await self.client.beta.threads.runs.create(thread_id=self.thread_id, assistant_id=self.assistant_id)
+                    run_id = run.id
+                    run = await self._poll(run, polls)
+            except asyncio.CancelledError:
+                call.set(status="cancelled")
+                if run_id is None and events is not None and events.current_run is not None:
+                    run_id = events.current_run.id
+                if run_id is not None:
+                    await self._cancel_run(run_id)
+                raise
+            except openai.NotFoundError:
+                # The message was just added, so a run that cannot be created lacks its assistant
+                started = run_id is not None or (events is not None and events.current_run is not None)
+                if started or not retry or self.recover is None:
+                    raise
+                call.set(status="error")
+                missing_assistant = True
+            if not missing_assistant:
+                call.set(model=run.model, polls=len(polls), run_status=run.status,
+                         status={"completed": "ok", "cancelled": "cancelled"}.get(run.status, "error"))
+                if run.usage is not None:
+                    call.usage(run.usage.prompt_tokens, run.usage.completion_tokens)
+        if missing_assistant:
+            self.assistant_id = await asyncio.to_thread(self.recover, "assistant")
+            return await self._run(prompt, delta, stream, retry=False)
+        metrics = last_record()
+        if run.status != "completed":
+            return Reply("", run.status, run.model, metrics=metrics)
+        # A polled run only has its answer on the thread
+        text = "".join(streamed) or await self.assistant_text(run.id)
+        usage = run.usage
+        return Reply(text, run.status, run.model, usage and usage.prompt_tokens, usage and usage.completion_tokens,
+                     metrics=metrics)
+
+    async def _send(self, prompt, delta):
+        return await self._run(prompt, delta, stream=False)
+
+    async def _stream(self, prompt, delta):
+        return await self._run(prompt, delta, stream=True)
+
+class GroqProvider(ChatProvider):
+    """Groq through LangChain's ChatGroq, remembering the last history_turns exchanges after a system prompt."""
+
+    def __init__(self, model, system_prompt=None, history_turns=5, chat=None, timeout=TURN_TIMEOUT):
+        super().__init__(model, timeout)
+        if chat is None:
+            from httpClients import groq_client
+            chat = groq_client(groq_api_key=os.environ.get("GROQ_API_KEY"), model_name=model,
+                               http_async_client=loop_http_client())
+        self.chat = chat
+        self.system_prompt = system_prompt
+        self.history_turns = history_turns
+        self.history = []  # (question, answer) of the latest exchanges
+
+    def _messages(self, prompt):
+        from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+        messages = [SystemMessage(content=self.system_prompt)] if self.system_prompt else []
+        for question, answer in self.history:
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        messages.append(HumanMessage(content=prompt))
+        return messages
+
+    def _reply(self, prompt, text, usage):
+        self.history = (self.history + [(prompt, text)])[-self.history_turns:] if self.history_turns else []
+        usage = usage or {}
+        return Reply(text, "completed", self.model, usage.get("input_tokens"), usage.get("output_tokens"),
+                     metrics=last_record())
+
+    async def _send(self, prompt, delta):
+        with span("groq", "chat", self.model) as call:
+            response = await self.chat.ainvoke(self._messages(prompt), config={"callbacks": [langchain_callback(call)]})
+        return self._reply(prompt, response.content, getattr(response, "usage_metadata", None))
+
+    async def _stream(self, prompt, delta):
+        received = []
+        usage = None
+        with span("groq", "chat.stream", self.model) as call:
+            try:
+                async for chunk in self.chat.astream(self._messages(prompt),
+                                                     config={"callbacks": [langchain_callback(call)]}):
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if chunk.content:
+                        call.first_token()
+                        received.append(chunk.content)
+                        delta(chunk.content)
+            except asyncio.CancelledError:
+                call.set(status="cancelled")
+                raise
+            if usage:
+                call.usage(usage.get("input_tokens"), usage.get("output_tokens"))
+        return self._reply(prompt, "".join(received), usage)
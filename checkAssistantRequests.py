@@ -0,0 +1,103 @@
+import os
+import sys
+import argparse
+from collections import Counter
+
+# Request-count check of the Assistants run paths used by Helper.py and HelperGUI.py.
+# Turns are sent through chatProviders.AssistantsProvider to an in-process
+# mockServer.py that counts the requests it receives per route:
+#   streamed  each turn must make exactly one messages.create and one streamed
+#             runs.create, with no run polls and no message listing
+#   polled    each turn may poll the run at most as often as the backoff schedule
+#             allows for a run of --tokens x --token-delay seconds, and lists the
+#             thread messages once
+# The script exits with 1 if a count is off, e.g. after a change that polls again:
+#   python checkAssistantRequests.py --turns 5 --tokens 40 --token-delay 0.05
+
+PROMPT = "Summarize the main idea of the uploaded notes in two sentences."
+
+def max_polls(run_seconds):
+    """Most run polls the backoff schedule can make before a run of run_seconds has finished.
+
+    Every wait lasts at least half of its delay, so the run is seen as
+    finished at the latest by the first poll after the shortest waits add up
+    to run_seconds.
+    """
+    from chatProviders import POLL_INITIAL_DELAY, POLL_MAX_DELAY, POLL_BACKOFF
+    polls = 0
+    waited = 0.0
+    delay = POLL_INITIAL_DELAY
+    while waited < run_seconds:
+        waited += delay * 0.5
+        delay = min(POLL_MAX_DELAY, delay * POLL_BACKOFF)
+        polls += 1
+    return max(polls, 1)
+
+def count_requests(state, provider, turns, stream):
+    """Requests per route received by the mock while provider answers turns prompts."""
+    from chatProviders import run
+    before = Counter(state.requests)
+    for _ in range(turns):
+        reply = run(provider.stream(PROMPT) if stream else provider.send(PROMPT))
+        if reply.status != "completed" or not reply.text:
+            raise RuntimeError(f"Run ended with status: {reply.status}")
+    return Counter(state.requests) - before
+
+def check(name, counts, expected, limits, turns):
+    """Print the counts of one path and return whether they match expected and stay within limits."""
+    ok = True
+    print(f"{name:>10}: {dict(sorted(counts.items()))} for {turns} turns")
+    for route in sorted(set(counts) | set(expected) | set(limits)):
+        actual = counts.get(route, 0)
+        if route in expected and actual != expected[route]:
+            print(f"[✗] {route}: {actual} requests, expected {expected[route]}")
+            ok = False
+        elif route in limits and actual > limits[route]:
+            print(f"[✗] {route}: {actual} requests, expected at most {limits[route]}")
+            ok = False
+        elif route not in expected and route not in limits:
+            print(f"[✗] {route}: {actual} unexpected requests")
+            ok = False
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count the Assistants requests made per streamed and polled turn.")
+    parser.add_argument("--turns", type=int, default=5, help="prompts sent on each path")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds before each mock response starts")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds per generated token")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens in every answer")
+    # No injected failures, so every request counted is one the provider chose to make
+    parser.set_defaults(error_rate=0.0, drop_rate=0.0, prefill_delay=0.0)
+    args = parser.parse_args(argv)
+
+    # Keep the check out of the metrics file
+    os.environ.setdefault("LLM_METRICS_PATH", "off")
+    from loadTest import start_mock_server
+    server = start_mock_server(args)
+    state = server.RequestHandlerClass.state
+    try:
+        from httpClients import openai_client
+        from chatProviders import AssistantsProvider
+        client = openai_client(max_retries=0)
+        assistant = client.beta.assistants.create(model="gpt-4o", instructions="Request count check",
+                                                  name="checkAssistantRequests", tools=[])
+        turns = args.turns
+        polls = max_polls(args.tokens * args.token_delay)
+
+        provider = AssistantsProvider(assistant.id, client.beta.threads.create().id)
+        streamed = check("streamed", count_requests(state, provider, turns, stream=True),
+                         {"create_message": turns, "create_run": turns}, {}, turns)
+        provider = AssistantsProvider(assistant.id, client.beta.threads.create().id)
+        polled = check("polled", count_requests(state, provider, turns, stream=False),
+                       {"create_message": turns, "create_run": turns, "list_messages": turns},
+                       {"retrieve_run": polls * turns}, turns)
+    finally:
+        server.shutdown()
+
+    if streamed and polled:
+        print(f"[✓] Request counts as expected (at most {polls} polls per polled run)")
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
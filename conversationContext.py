@@ -0,0 +1,190 @@
+import os
+import json
+import math
+
+# Token-budgeted conversation history for the Claude front-ends. The full history
+# is kept, but each request only sends a view of it that fits CONTEXT_TOKEN_BUDGET:
+# older attachments (the text of uploaded PDFs) are shortened first, then the
+# oldest turns are left out, and the most recent KEEP_RECENT_MESSAGES messages are
+# always sent. Token counts are estimated from the text length and cached per
+# message, so building the view does not rescan the whole conversation.
+#
+# With prompt caching the stable prefixes of a request are marked with
+# cache_control: the system prompt, the newest attachment and the last user
+# message. Claude then reads the cached system prompt, documents and earlier turns
+# instead of processing them again, which lowers input cost and time to first token.
+
+# Estimated tokens per request; override with the CLAUDE_CONTEXT_BUDGET environment variable
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CLAUDE_CONTEXT_BUDGET", 60000))
+
+# Messages at the end of the conversation that are never left out
+KEEP_RECENT_MESSAGES = 6
+
+# Size an attachment outside the recent messages is shortened to
+ATTACHMENT_TOKENS = 2000
+
+# Smallest size a recent attachment is cut to when the recent messages alone exceed the budget
+MIN_ATTACHMENT_TOKENS = 250
+
+# Conservative characters-per-token ratio for English text, plus per-message overhead
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Characters kept from the end of a shortened text, so closing instructions survive
+TAIL_CHARS = 200
+
+# Cache breakpoint added to stable content blocks when prompt caching is on
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Instructions of config.json, sent to Claude as the system prompt; None without a config file
+def load_instructions(config_file="config.json"):
+    if not os.path.exists(config_file):
+        return None
+    with open(config_file, 'r') as file:
+        return json.load(file).get('instructions')
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+def shorten(text, tokens):
+    """Cut text to about tokens tokens, keeping its beginning and its last TAIL_CHARS characters."""
+    budget_chars = max(0, int((tokens - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN))
+    if len(text) <= budget_chars:
+        return text
+    omitted = estimate_tokens(text) - tokens
+    marker = f"\n\n[... about {omitted} tokens omitted to fit the conversation budget ...]\n\n"
+    tail = text[-TAIL_CHARS:] if budget_chars > 2 * TAIL_CHARS + len(marker) else ""
+    head = text[:max(0, budget_chars - len(tail) - len(marker))]
+    return head + marker + tail
+
+class _Entry:
+    def __init__(self, role, content, attachment, later=None):
+        self.role = role
+        self.content = content
+        self.attachment = attachment
+        self.tokens = estimate_tokens(content)
+        self.later = later
+        self.later_tokens = None if later is None else estimate_tokens(later)
+        self.shortened = {}  # token limit -> (text, tokens)
+
+    def shortened_to(self, tokens):
+        if tokens not in self.shortened:
+            if len(self.shortened) >= 4:
+                self.shortened.clear()
+            text = shorten(self.content, tokens)
+            self.shortened[tokens] = (text, estimate_tokens(text))
+        return self.shortened[tokens]
+
+class ConversationContext:
+    """Conversation messages for Claude, sent within a token budget.
+
+    append() adds a message; mark PDF text and other bulky content with
+    attachment=True so it is shortened before any turn is left out. A user
+    message given later= is sent in full only while it is the last user
+    message, and as later afterwards (e.g. a question without the passages
+    retrieved for it).
+    request_params() returns the system and messages arguments of the next
+    request, and last_trim describes what was left out of it. The system
+    prompt counts against the budget. With prompt_caching the stable prefixes
+    carry cache_control breakpoints.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, keep_recent=KEEP_RECENT_MESSAGES,
+                 attachment_tokens=ATTACHMENT_TOKENS, system=None, prompt_caching=True):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.attachment_tokens = attachment_tokens
+        self.system = system
+        self.system_tokens = estimate_tokens(system) if system else 0
+        self.prompt_caching = prompt_caching
+        self.entries = []
+        self.last_trim = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, role, content, attachment=False, later=None):
+        self.entries.append(_Entry(role, content, attachment, later))
+
+    def pop(self):
+        entry = self.entries.pop()
+        return {"role": entry.role, "content": entry.content}
+
+    def total_tokens(self):
+        return sum(entry.tokens for entry in self.entries)
+
+    def request_messages(self):
+        """Messages of the next request, within the budget left after the system prompt."""
+        return [{"role": role, "content": content} for role, content, attachment in self._budgeted()]
+
+    def request_params(self):
+        """Keyword arguments system (when set) and messages for messages.create or messages.stream."""
+        view = self._budgeted()
+        messages = [{"role": role, "content": content} for role, content, attachment in view]
+        params = {"messages": messages}
+        if self.system:
+            params["system"] = [{"type": "text", "text": self.system}]
+        if not self.prompt_caching:
+            return params
+
+        # Up to 4 breakpoints are allowed; everything before a breakpoint is cached with it
+        if self.system:
+            params["system"][0]["cache_control"] = CACHE_CONTROL
+        marked = [index for index, (role, content, attachment) in enumerate(view) if attachment][-1:]
+        marked += [index for index, (role, content, attachment) in enumerate(view) if role == "user"][-1:]
+        for index in set(marked):
+            messages[index]["content"] = [{"type": "text", "text": messages[index]["content"],
+                                           "cache_control": CACHE_CONTROL}]
+        return params
+
+    def _budgeted(self):
+        budget = self.budget - self.system_tokens
+        entries = self.entries
+        last_user = max((index for index, entry in enumerate(entries) if entry.role == "user"), default=-1)
+        replaced = [entry.later is not None and index != last_user for index, entry in enumerate(entries)]
+        base = [entry.later if replaced[index] else entry.content for index, entry in enumerate(entries)]
+        attachments = [entry.attachment and not replaced[index] for index, entry in enumerate(entries)]
+        texts = list(base)
+        tokens = [entry.later_tokens if replaced[index] else entry.tokens for index, entry in enumerate(entries)]
+        total = sum(tokens)
+        full_total = total + self.system_tokens
+        recent_start = max(0, len(entries) - self.keep_recent)
+
+        # 1. Shorten older attachments, oldest first
+        for index in range(recent_start):
+            if total <= budget:
+                break
+            entry = entries[index]
+            if attachments[index] and entry.tokens > self.attachment_tokens:
+                texts[index], new_tokens = entry.shortened_to(self.attachment_tokens)
+                total -= tokens[index] - new_tokens
+                tokens[index] = new_tokens
+
+        # 2. Leave out the oldest messages; the request must still start with a user turn
+        start = 0
+        while start < recent_start and (total > budget or entries[start].role != "user"):
+            total -= tokens[start]
+            start += 1
+        while start < len(entries) - 1 and entries[start].role != "user":
+            total -= tokens[start]
+            start += 1
+
+        # 3. Recent messages alone are over budget: shorten their attachments, largest first
+        if total > budget:
+            for index in sorted(range(start, len(entries)), key=lambda index: -tokens[index]):
+                if total <= budget:
+                    break
+                if not attachments[index]:
+                    continue
+                limit = max(MIN_ATTACHMENT_TOKENS, tokens[index] - (total - budget))
+                texts[index], new_tokens = entries[index].shortened_to(limit)
+                total -= tokens[index] - new_tokens
+                tokens[index] = new_tokens
+
+        shortened = sum(texts[index] is not base[index] for index in range(start, len(entries)))
+        if start or shortened:
+            self.last_trim = (f"sent about {total + self.system_tokens} of {full_total} tokens; "
+                              f"{start} earlier message(s) left out, {shortened} attachment(s) shortened")
+        else:
+            self.last_trim = None
+        return [(entries[index].role, texts[index], attachments[index]) for index in range(start, len(entries))]
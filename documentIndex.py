@@ -0,0 +1,161 @@
+import os
+import re
+import math
+import heapq
+import threading
+from conversationContext import estimate_tokens, shorten
+
+# Local retrieval for the documents uploaded to ClaudeChatUL.py and ClaudeGUI.py.
+# A document too large to send in full is split into overlapping chunks of words
+# and added to an in-memory BM25 inverted index that lives as long as the session.
+# Each question is then sent with only the best-matching chunks, at most TOP_K of
+# them and within RETRIEVAL_TOKENS, instead of the whole text. Documents that fit
+# in RETRIEVAL_TOKENS are still sent whole (and prompt-cached).
+
+# Estimated tokens of retrieved passages per question; override with CLAUDE_RETRIEVAL_BUDGET
+RETRIEVAL_TOKENS = int(os.environ.get("CLAUDE_RETRIEVAL_BUDGET", 6000))
+
+# Chunks sent per question at most
+TOP_K = 8
+
+# Words per chunk, and words shared by consecutive chunks so no passage is cut in two
+CHUNK_WORDS = 250
+CHUNK_OVERLAP_WORDS = 50
+
+# BM25 term frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = set((
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "me my of on or our so than that the their them then there these they this to was we "
+    "what when where which who why will with you your"
+).split())
+
+def terms(text):
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOP_WORDS]
+
+def with_passages(question, passages):
+    """Prompt that sends question together with the passages retrieved for it."""
+    return (f"Excerpts from the uploaded documents that best match the question:\n\n{passages}\n\n"
+            f"Answer using these excerpts. Question: {question}")
+
+class Chunk:
+    def __init__(self, document, page, position, text):
+        self.document = document
+        self.page = page
+        self.position = position  # order within the index
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+class DocumentIndex:
+    """BM25 index over the chunks of the documents of one session.
+
+    ingest() adds a document, search() ranks chunks for a query and
+    passages() formats the best chunks of a question within a token budget.
+    Safe to use from several worker threads.
+    """
+
+    def __init__(self, chunk_words=CHUNK_WORDS, overlap_words=CHUNK_OVERLAP_WORDS):
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+        self.chunks = []
+        self.postings = {}  # term -> list of (chunk position, term frequency)
+        self.lengths = []  # terms per chunk
+        self.total_length = 0
+        self.documents = []
+        self.document_chunks = []  # (position of the first chunk, chunk count) per document
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def ingest(self, name, pages, full_text_tokens=RETRIEVAL_TOKENS):
+        """Index a document given as page texts, unless it fits in full_text_tokens.
+
+        Returns (text, chunks): the full text and 0 when the document is small
+        enough to send whole, or None and the number of chunks indexed.
+        """
+        text = "\n".join(pages)
+        if estimate_tokens(text) <= full_text_tokens:
+            return text, 0
+        return None, self.add_document(name, pages)
+
+    def add_document(self, name, pages):
+        # Words tagged with their page, cut into windows of chunk_words
+        words = []
+        word_pages = []
+        for page, page_text in enumerate(pages):
+            page_words = page_text.split()
+            words.extend(page_words)
+            word_pages.extend([page] * len(page_words))
+        step = max(1, self.chunk_words - self.overlap_words)
+        starts = range(0, max(1, len(words) - self.overlap_words), step)
+        new_chunks = [(word_pages[start] if words else 0, " ".join(words[start:start + self.chunk_words]))
+                      for start in starts]
+
+        with self.lock:
+            self.documents.append(name)
+            first = len(self.chunks)
+            for page, text in new_chunks:
+                if not text:
+                    continue
+                chunk = Chunk(name, page, len(self.chunks), text)
+                counts = {}
+                chunk_terms = terms(text)
+                for term in chunk_terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, frequency in counts.items():
+                    self.postings.setdefault(term, []).append((chunk.position, frequency))
+                self.chunks.append(chunk)
+                self.lengths.append(len(chunk_terms))
+                self.total_length += len(chunk_terms)
+            self.document_chunks.append((first, len(self.chunks) - first))
+            return len(self.chunks) - first
+
+    def search(self, query, k=TOP_K):
+        """The k best chunks for query as (score, chunk), best first; chunks sharing no term are left out."""
+        with self.lock:
+            count = len(self.chunks)
+            if not count:
+                return []
+            average_length = self.total_length / count or 1
+            scores = {}
+            for term in set(terms(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for position, frequency in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / average_length)
+                    scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(score, self.chunks[position]) for position, score in best]
+
+    def passages(self, query, k=TOP_K, token_budget=RETRIEVAL_TOKENS):
+        """Text of the best chunks for query that fit in token_budget, in document order.
+
+        When no chunk shares a term with the query (e.g. "summarize this") the
+        opening chunks of the documents are used instead, taken from each
+        document in turn so that every document is represented.
+        """
+        hits = [chunk for score, chunk in self.search(query, k)]
+        if not hits:
+            with self.lock:
+                longest = max((count for first, count in self.document_chunks), default=0)
+                hits = [self.chunks[first + rank] for rank in range(longest)
+                        for first, count in self.document_chunks if rank < count][:k]
+        selected = []
+        used = 0
+        for chunk in hits:
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+        if not selected and hits:
+            # Not even the best chunk fits: send it cut to the budget
+            best = hits[0]
+            return f"[{os.path.basename(best.document)}, page {best.page + 1}]\n{shorten(best.text, token_budget)}"
+        selected.sort(key=lambda chunk: chunk.position)
+        return "\n\n".join(f"[{os.path.basename(chunk.document)}, page {chunk.page + 1}]\n{chunk.text}"
+                           for chunk in selected)
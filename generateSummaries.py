@@ -1,15 +1,18 @@
 import os
+import sys
 import json
-import PyPDF2
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.text_rank import TextRankSummarizer
-import nltk
-from nltk.data import find, path as nltk_path
+import time
+import argparse
 from datetime import datetime
+from pdfText import file_digest, iter_pdf_pages
+# Heavy dependencies (PyPDF2, sumy, nltk, numpy/scipy) are imported inside the
+# functions that need them, so importing this module, planning a run or doing a
+# dry run does not pay for them.
 # Install tokenizers with: 
 # python -c "import nltk; nltk.download('punkt_tab')"
 
+_module_start = time.perf_counter()
+
 # Constant value identifying the OPUS version
 OPUS = 4235
 
@@ -22,70 +25,178 @@ OPUS_PATH = "opus_4235.json"
 # Directory containing unit folders named in a specific format
 OPUS_MATERIALS = "C:\\temp\\Units"
 
-# Directory to store tokenizer data and generated JSON files
-OUTPUT_DIR = os.path.dirname(OPUS_PATH)
-NLTK_DATA_DIR = os.path.abspath(OUTPUT_DIR)
-nltk_path.append(NLTK_DATA_DIR)  # Add to nltk search path
+# TextRank engine: "sparse" (vectorized, textRank.py) or "sumy" (pure Python pairwise)
+TEXTRANK_BACKEND = "sparse"
+
+# Optional cap on the characters extracted per PDF (None = whole document)
+MAX_PDF_CHARS = None
+
+# Number of worker processes used to extract and summarize PDFs (1 = sequential)
+WORKERS = os.cpu_count() or 1
+
+# Identifies the extraction/summarization code; bump it to invalidate cached summaries
+SUMMARIZER_VERSION = "pypdf2-sumy-textrank-2"
+
+# Log file; run() points it at the output directory
+log_file_path = "log.txt"
+
+# Queue of the LogSink (logSink.py) owned by run(); set in worker processes by init_worker.
+# When None, log() writes directly to log_file_path.
+_log_queue = None
 
-# Setup log file
-log_file_path = os.path.join(OUTPUT_DIR, "log.txt")
 def log(message):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     full_message = f"[{timestamp}] {message}"
+    if _log_queue is not None:
+        _log_queue.put(("text", full_message))
+        return
     print(full_message)
     with open(log_file_path, 'a', encoding='utf-8') as log_file:
         log_file.write(full_message + "\n")
 
-# Ensure 'punkt' tokenizer is available in OUTPUT_DIR
-try:
-    find('tokenizers/punkt')
-    log("[✓] 'punkt' tokenizer found.")
-except LookupError:
-    log("[!] 'punkt' tokenizer not found. Downloading to output directory...")
-    nltk.download('punkt', download_dir=NLTK_DATA_DIR)
-    log(f"[✓] 'punkt' tokenizer downloaded to: {NLTK_DATA_DIR}")
-
-# Show all directories NLTK will search
-log(f"[!] NLTK search paths: {nltk_path}")
-
-# List to hold [folder path, descriptor] pairs
-folder_descriptor_pairs = []
-
-# Iterate through entries in the OPUS_MATERIALS directory
-log("[!] Scanning OPUS_MATERIALS directory...")
-for entry in os.listdir(OPUS_MATERIALS):
-    full_path = os.path.join(OPUS_MATERIALS, entry)
-    if os.path.isdir(full_path):
-        descriptor = entry.split()[0]
-        folder_descriptor_pairs.append([full_path, descriptor])
-log(f"[✓] Found {len(folder_descriptor_pairs)} unit folders.")
-
-# Extract text from a PDF file given its path
-def extract_text_from_pdf(pdf_path):
-    text = ""
+# Structured record for log.jsonl; dropped when no LogSink is running
+def log_event(**fields):
+    if _log_queue is not None:
+        fields.setdefault("time", datetime.now().isoformat(timespec="milliseconds"))
+        fields.setdefault("pid", os.getpid())
+        _log_queue.put(("event", fields))
+
+# Ensure 'punkt' tokenizer is available, downloading it to nltk_data_dir if needed
+def ensure_tokenizer(nltk_data_dir):
+    import nltk
+    from nltk.data import find, path as nltk_path
+    if nltk_data_dir not in nltk_path:
+        nltk_path.append(nltk_data_dir)  # Add to nltk search path
+    try:
+        find('tokenizers/punkt')
+        log("[✓] 'punkt' tokenizer found.")
+    except LookupError:
+        log("[!] 'punkt' tokenizer not found. Downloading to output directory...")
+        nltk.download('punkt', download_dir=nltk_data_dir)
+        log(f"[✓] 'punkt' tokenizer downloaded to: {nltk_data_dir}")
+
+    # Show all directories NLTK will search
+    log(f"[!] NLTK search paths: {nltk_path}")
+
+# Prepare a worker process: log through the parent's LogSink and use its NLTK search path
+def init_worker(log_queue, nltk_data_dir):
+    global _log_queue
+    _log_queue = log_queue
+    from nltk.data import path as nltk_path
+    nltk_path.append(nltk_data_dir)
+
+# Cache key suffix covering every setting that changes a summary
+def settings_key(percentage, max_chars, backend):
+    return f"{percentage}:{max_chars}:{backend}:{SUMMARIZER_VERSION}"
+
+# Placeholder texts recorded when a PDF cannot be processed; never cached
+PDF_ERROR = "Error reading PDF."
+SUMMARY_ERROR = "Error summarizing PDF."
+
+class SummaryCache:
+    """Summaries keyed by PDF content hash and the settings_key of the run.
+
+    File size and modification time are remembered per path so unchanged files
+    are not hashed again. Entries not seen during the current run are dropped
+    on save, which evicts deleted files and stale settings.
+    """
+
+    def __init__(self, cache_path, settings):
+        self.cache_path = cache_path
+        self.settings = settings
+        self.files = {}  # pdf path -> [size, mtime_ns, sha256]
+        self.summaries = {}  # cache key -> summary
+        self.seen_files = set()
+        self.seen_keys = set()
+        self.hits = 0
+        self.misses = 0
+        if cache_path is None:
+            return
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            self.files = data.get('files', {})
+            self.summaries = data.get('summaries', {})
+            log(f"[✓] Loaded {len(self.summaries)} cached summaries from: {cache_path}")
+        except FileNotFoundError:
+            log(f"[!] No summary cache found at: {cache_path}")
+        except Exception as e:
+            log(f"[✗] Ignoring unreadable summary cache {cache_path}: {str(e)}")
+
+    def key_for(self, pdf_path, record=True):
+        if self.cache_path is None:
+            # Caching is off (--no-cache): no key, so the PDF is not hashed
+            return None
+        try:
+            stat = os.stat(pdf_path)
+            known = self.files.get(pdf_path)
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                digest = known[2]
+            else:
+                digest = file_digest(pdf_path)
+                self.files[pdf_path] = [stat.st_size, stat.st_mtime_ns, digest]
+        except OSError as e:
+            log(f"[✗] Cannot hash {pdf_path}: {str(e)}")
+            return None
+        key = f"{digest}:{self.settings}"
+        if record:
+            self.seen_files.add(pdf_path)
+            self.seen_keys.add(key)
+        return key
+
+    def get(self, key):
+        summary = self.summaries.get(key) if key else None
+        if summary is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary
+
+    def put(self, key, summary):
+        if key:
+            self.summaries[key] = summary
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        self.files = {path: info for path, info in self.files.items() if path in self.seen_files}
+        self.summaries = {key: summary for key, summary in self.summaries.items() if key in self.seen_keys}
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump({"files": self.files, "summaries": self.summaries}, cache_file)
+            os.replace(temp_path, self.cache_path)
+            log(f"[✓] Summary cache saved: {self.cache_path} ({self.hits} reused, {self.misses} processed)")
+        except Exception as e:
+            log(f"[✗] Failed to save summary cache {self.cache_path}: {str(e)}")
+
+# Extract text from a PDF file given its path, one page at a time
+def extract_text_from_pdf(pdf_path, max_chars=MAX_PDF_CHARS):
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() or ""
+        text = " ".join(iter_pdf_pages(pdf_path, max_chars=max_chars, normalize=True))
         log("-------------------------------")
         log(f"[✓] Extracted text from: {pdf_path}")
     except Exception as e:
         log("-------------------------------")
         log(f"[✗] Error reading PDF {pdf_path}: {str(e)}")
-        return "Error reading PDF."
-    return text.strip().replace("\n", " ")
+        return PDF_ERROR
+    return text.strip()
 
-# Generate a summary using the TextRank algorithm via sumy
-def generate_summary(text):
+# Generate a summary using the TextRank engine selected by backend
+def generate_summary(text, percentage=SUMMARY_PERCENTAGE, backend=TEXTRANK_BACKEND):
     if not text:
         return "No content found."
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.nlp.tokenizers import Tokenizer
     parser = PlaintextParser.from_string(text, Tokenizer("english"))
     total_sentences = len(list(parser.document.sentences))
-    sentence_count = max(1, total_sentences * SUMMARY_PERCENTAGE // 100)
+    sentence_count = max(1, total_sentences * percentage // 100)
     log(f"[!] Total sentences: {total_sentences}, Summarized sentences: {sentence_count}")
-    summarizer = TextRankSummarizer()
-    summary_sentences = summarizer(parser.document, sentence_count)
+    if backend == "sparse":
+        from textRank import SparseTextRankSummarizer as Summarizer
+    else:
+        from sumy.summarizers.text_rank import TextRankSummarizer as Summarizer
+    summary_sentences = Summarizer()(parser.document, sentence_count)
     return " ".join(str(sentence) for sentence in summary_sentences)
 
 # Recursively gather all PDF file paths in a folder
@@ -98,24 +209,297 @@ def process_folder(folder_path):
     log(f"[✓] Found {len(pdf_files)} PDFs in: {folder_path}")
     return pdf_files
 
-# Process each folder-descriptor pair
-for folder_path, descriptor in folder_descriptor_pairs:
-    log("==============================")
-    log(f"[!] Processing folder: {folder_path} with descriptor: {descriptor}")
-    knowledge_entries = []
-    pdfs = process_folder(folder_path)
-    for pdf_path in pdfs:
-        content = extract_text_from_pdf(pdf_path)
-        summary = generate_summary(content)
-        knowledge_entries.append({"file": pdf_path, "summary": summary})
+# Extract and summarize a single PDF; runs inside a worker process when workers > 1.
+# Returns the knowledge entry and whether the summary is worth caching.
+def process_pdf(pdf_path, percentage=SUMMARY_PERCENTAGE, backend=TEXTRANK_BACKEND, max_chars=MAX_PDF_CHARS):
+    start = time.perf_counter()
+    content = ""
+    extract_seconds = None
+    try:
+        content = extract_text_from_pdf(pdf_path, max_chars)
+        extract_seconds = time.perf_counter() - start
+        summary = generate_summary(content, percentage, backend)
+        ok = content != PDF_ERROR
+    except Exception as e:
+        log(f"[✗] Failed to summarize {pdf_path}: {str(e)}")
+        summary = SUMMARY_ERROR
+        ok = False
+    total_seconds = time.perf_counter() - start
+    log_event(event="pdf", file=pdf_path, ok=ok, cached=False, chars=len(content),
+              extract_seconds=extract_seconds,
+              summarize_seconds=None if extract_seconds is None else total_seconds - extract_seconds,
+              total_seconds=total_seconds)
+    return {"file": pdf_path, "summary": summary}, ok
+
+class WorkerPool:
+    """Runs process_pdf in worker processes without letting one failure stop the run.
+
+    A PDF that kills its worker (e.g. a crash inside the PDF library, or the
+    out-of-memory killer) breaks the whole ProcessPoolExecutor, and every
+    pending PDF fails with BrokenProcessPool. The pool is then restarted, the
+    PDF being collected is processed alone to tell whether it caused the crash,
+    and the other interrupted PDFs are submitted again, so only a PDF that
+    kills a worker by itself is recorded as failed.
+    """
+
+    def __init__(self, workers, settings, initargs):
+        self.workers = workers
+        self.settings = settings
+        self.initargs = initargs
+        self.futures = {}  # pdf_path -> future of a PDF not collected yet
+        self.executor = self._start()
+
+    def _start(self):
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=self.initargs)
+
+    def _restart(self):
+        # Waiting lets the broken pool fail all of its pending futures first
+        self.executor.shutdown()
+        self.executor = self._start()
+
+    def submit(self, pdf_path):
+        self.futures[pdf_path] = self.executor.submit(process_pdf, pdf_path, *self.settings)
 
+    def result(self, pdf_path):
+        """The (entry, ok) result of a submitted PDF, in the same form as process_pdf."""
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            return self.futures.pop(pdf_path).result()
+        except BrokenProcessPool:
+            log(f"[!] A worker process died while {pdf_path} was pending; restarting the workers")
+        except Exception as e:
+            log(f"[✗] Worker failed on {pdf_path}: {str(e)}")
+            return {"file": pdf_path, "summary": SUMMARY_ERROR}, False
+
+        self._restart()
+        try:
+            result = self.executor.submit(process_pdf, pdf_path, *self.settings).result()
+        except BrokenProcessPool:
+            log(f"[✗] Worker process died on {pdf_path}")
+            self._restart()
+            result = {"file": pdf_path, "summary": SUMMARY_ERROR}, False
+        except Exception as e:
+            log(f"[✗] Worker failed on {pdf_path}: {str(e)}")
+            result = {"file": pdf_path, "summary": SUMMARY_ERROR}, False
+        for pending_path, future in list(self.futures.items()):
+            if isinstance(future.exception(), BrokenProcessPool):
+                self.submit(pending_path)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+class KnowledgeBaseWriter:
+    """Streams the knowledgeBase entries of one descriptor to disk as they are produced.
+
+    The parsed OPUS template is serialized once around a placeholder and each
+    entry is appended and flushed to a .part file, which atomically replaces
+    opus_{opus}_{descriptor}.json when the unit is complete. The result is
+    identical to json.dump(..., indent=2) of the whole structure. Errors are
+    logged and stop further writes without interrupting the run.
+    """
+
+    PLACEHOLDER = "__knowledgeBase__"
+
+    def __init__(self, template, output_dir, opus, descriptor):
+        self.descriptor = descriptor
+        self.output_filename = os.path.join(output_dir, f"opus_{opus}_{descriptor}.json")
+        self.temp_path = self.output_filename + ".part"
+        self.count = 0
+        self.file = None
+        try:
+            opus_data = dict(template)
+            opus_data['knowledgeBase'] = self.PLACEHOLDER
+            prefix, self.suffix = json.dumps(opus_data, indent=2).split(json.dumps(self.PLACEHOLDER), 1)
+            self.file = open(self.temp_path, 'w')
+            self.file.write(prefix + "[")
+        except Exception as e:
+            self.fail(e)
+
+    def write(self, entry):
+        if self.file is None:
+            return
+        try:
+            item = json.dumps(entry, indent=2).replace("\n", "\n    ")
+            self.file.write(("," if self.count else "") + "\n    " + item)
+            self.file.flush()
+            self.count += 1
+        except Exception as e:
+            self.fail(e)
+
+    def close(self):
+        if self.file is None:
+            return False
+        try:
+            self.file.write(("\n  ]" if self.count else "]") + self.suffix)
+            self.file.close()
+            self.file = None
+            os.replace(self.temp_path, self.output_filename)
+            log(f"[✓] Written summary JSON: {self.output_filename}")
+            return True
+        except Exception as e:
+            self.fail(e)
+            return False
+
+    def fail(self, error):
+        log(f"[✗] Failed to write JSON for descriptor {self.descriptor}: {str(error)}")
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# Parse the OPUS template once for all descriptors
+def load_template(opus_path):
+    with open(opus_path, 'r') as base_file:
+        return json.load(base_file)
+
+def plan(materials_dir=OPUS_MATERIALS):
+    """Return [folder path, descriptor, PDF paths] for every unit folder.
+
+    Only walks the directory tree; nothing is extracted or imported.
+    """
+    units = []
+    for entry in sorted(os.listdir(materials_dir)):
+        full_path = os.path.join(materials_dir, entry)
+        if os.path.isdir(full_path):
+            descriptor = entry.split()[0]
+            units.append([full_path, descriptor, process_folder(full_path)])
+    return units
+
+def dry_run(materials_dir=OPUS_MATERIALS, opus_path=OPUS_PATH, output_dir=None, opus=OPUS,
+            percentage=SUMMARY_PERCENTAGE, backend=TEXTRANK_BACKEND, max_chars=MAX_PDF_CHARS):
+    """Print what run() would do with the same arguments, without processing any PDF."""
+    global log_file_path
+    output_dir = os.path.dirname(opus_path) if output_dir is None else output_dir
+    log_file_path = os.path.join(output_dir, "log.txt")
+    units = plan(materials_dir)
+    cache = SummaryCache(os.path.join(output_dir, "summary_cache.json"),
+                         settings_key(percentage, max_chars, backend))
+    total = pending = 0
+    for folder_path, descriptor, pdfs in units:
+        missing = [pdf_path for pdf_path in pdfs if cache.get(cache.key_for(pdf_path, record=False)) is None]
+        total += len(pdfs)
+        pending += len(missing)
+        output_filename = os.path.join(output_dir, f"opus_{opus}_{descriptor}.json")
+        print(f"{descriptor}: {len(pdfs)} PDFs, {len(missing)} to summarize -> {output_filename}")
+    print(f"{len(units)} units, {total} PDFs, {pending} to summarize, {total - pending} cached")
+    return units
+
+def run(materials_dir=OPUS_MATERIALS, opus_path=OPUS_PATH, output_dir=None, opus=OPUS,
+        percentage=SUMMARY_PERCENTAGE, backend=TEXTRANK_BACKEND, max_chars=MAX_PDF_CHARS,
+        workers=WORKERS, use_cache=True):
+    """Summarize every PDF under materials_dir into opus_{opus}_{descriptor}.json files.
+
+    output_dir defaults to the folder of opus_path and also holds log.txt,
+    summary_cache.json, the NLTK tokenizer data and log.jsonl, which holds one
+    JSON record with timings per PDF and one per run. Returns the output paths written.
+    """
+    global log_file_path, _log_queue
+    output_dir = os.path.dirname(opus_path) if output_dir is None else output_dir
+    log_file_path = os.path.join(output_dir, "log.txt")
+    from logSink import LogSink
+    sink = LogSink(log_file_path, os.path.join(output_dir, "log.jsonl"))
+    _log_queue = sink.queue
     try:
-        with open(OPUS_PATH, 'r') as base_file:
-            opus_data = json.load(base_file)
-        opus_data['knowledgeBase'] = knowledge_entries
-        output_filename = os.path.join(OUTPUT_DIR, f"opus_{OPUS}_{descriptor}.json")
-        with open(output_filename, 'w') as output_file:
-            json.dump(opus_data, output_file, indent=2)
-        log(f"[✓] Written summary JSON: {output_filename}")
+        return _run(sink, materials_dir, opus_path, output_dir, opus, percentage, backend, max_chars, workers, use_cache)
+    finally:
+        _log_queue = None
+        sink.close()
+
+def _run(sink, materials_dir, opus_path, output_dir, opus, percentage, backend, max_chars, workers, use_cache):
+    run_start = time.perf_counter()
+    nltk_data_dir = os.path.abspath(output_dir)
+
+    start = time.perf_counter()
+    ensure_tokenizer(nltk_data_dir)
+    log(f"[!] NLTK loaded in {time.perf_counter() - start:.2f}s")
+
+    # Iterate through entries in the materials directory
+    log("[!] Scanning OPUS_MATERIALS directory...")
+    units = plan(materials_dir)
+    log(f"[✓] Found {len(units)} unit folders.")
+
+    try:
+        template = load_template(opus_path)
     except Exception as e:
-        log(f"[✗] Failed to write JSON for descriptor {descriptor}: {str(e)}")
+        log(f"[✗] Failed to read OPUS template {opus_path}: {str(e)}")
+        return []
+
+    settings = (percentage, backend, max_chars)
+    cache_path = os.path.join(output_dir, "summary_cache.json") if use_cache else None
+    cache = SummaryCache(cache_path, settings_key(percentage, max_chars, backend))
+    pool = None
+    if workers > 1:
+        log(f"[!] Processing PDFs with {workers} worker processes")
+        pool = WorkerPool(workers, settings, (sink.queue, nltk_data_dir))
+
+    written = []
+    try:
+        # Look up every PDF of every unit in the cache and submit the misses up
+        # front so all workers stay busy; results are gathered per descriptor in
+        # the same order as the files were found
+        submitted = []
+        for folder_path, descriptor, pdfs in units:
+            jobs = []
+            for pdf_path in pdfs:
+                key = cache.key_for(pdf_path)
+                summary = cache.get(key)
+                if summary is None and pool is not None:
+                    pool.submit(pdf_path)
+                jobs.append((pdf_path, key, summary))
+            submitted.append((folder_path, descriptor, jobs))
+
+        for folder_path, descriptor, jobs in submitted:
+            log("==============================")
+            log(f"[!] Processing folder: {folder_path} with descriptor: {descriptor}")
+            writer = KnowledgeBaseWriter(template, output_dir, opus, descriptor)
+            for pdf_path, key, summary in jobs:
+                if summary is not None:
+                    log(f"[✓] Reusing cached summary: {pdf_path}")
+                    log_event(event="pdf", file=pdf_path, ok=True, cached=True)
+                    writer.write({"file": pdf_path, "summary": summary})
+                    continue
+                # Without worker processes the PDF is processed here
+                entry, ok = pool.result(pdf_path) if pool is not None else process_pdf(pdf_path, *settings)
+                if ok:
+                    cache.put(key, entry["summary"])
+                writer.write(entry)
+            if writer.close():
+                written.append(writer.output_filename)
+            # Persist finished summaries per unit so a crash only loses the current unit
+            cache.save()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        cache.save()
+        log_event(event="run", units=len(units), written=len(written), workers=workers,
+                  reused=cache.hits, processed=cache.misses, total_seconds=time.perf_counter() - run_start)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the PDFs of every unit folder into OPUS knowledge base JSON files.")
+    parser.add_argument("--materials", default=OPUS_MATERIALS, help="directory containing the unit folders")
+    parser.add_argument("--opus-path", default=OPUS_PATH, help="OPUS JSON template")
+    parser.add_argument("--output-dir", default=None, help="output directory (default: folder of --opus-path)")
+    parser.add_argument("--opus", type=int, default=OPUS, help="OPUS number used in output file names")
+    parser.add_argument("--percentage", type=int, default=SUMMARY_PERCENTAGE, help="percentage of sentences kept")
+    parser.add_argument("--backend", choices=["sparse", "sumy"], default=TEXTRANK_BACKEND, help="TextRank engine")
+    parser.add_argument("--max-chars", type=int, default=MAX_PDF_CHARS, help="characters extracted per PDF")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes (1 = sequential)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update summary_cache.json")
+    parser.add_argument("--dry-run", action="store_true", help="list units and pending PDFs without processing")
+    args = parser.parse_args(argv)
+
+    options = dict(materials_dir=args.materials, opus_path=args.opus_path, output_dir=args.output_dir,
+                   opus=args.opus, percentage=args.percentage, backend=args.backend, max_chars=args.max_chars)
+    print(f"[!] Startup took {(time.perf_counter() - _module_start) * 1000:.0f} ms")
+    if args.dry_run:
+        start = time.perf_counter()
+        dry_run(**options)
+        print(f"[!] Dry run took {(time.perf_counter() - start) * 1000:.0f} ms")
+        return 0
+    run(workers=args.workers, use_cache=not args.no_cache, **options)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
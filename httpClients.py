@@ -0,0 +1,120 @@
+import os
+import atexit
+import threading
+import importlib.util
+import httpx
+from llmMetrics import on_http_request
+
+# Shared HTTP layer for the chat front-ends. Every SDK client built here sends its
+# requests through one pooled httpx.Client per process, so repeated requests reuse
+# warm keep-alive connections instead of opening a new TLS session per client.
+# Async clients are bound to an event loop, so their pools are separate; chatProviders.py
+# shares one among all providers on its loop.
+#
+# Settings come from the environment:
+#   LLM_HTTP_TIMEOUT           read/write timeout in seconds (default 120)
+#   LLM_CONNECT_TIMEOUT        connect timeout in seconds (default 10)
+#   LLM_MAX_CONNECTIONS        connections in the pool (default 20)
+#   LLM_KEEPALIVE_CONNECTIONS  idle connections kept open (default 10)
+#   LLM_KEEPALIVE_EXPIRY       seconds an idle connection is kept (default 60)
+#   LLM_HTTP2                  set to 1 to negotiate HTTP/2 (needs the h2 package)
+#   OPENAI_BASE_URL, ANTHROPIC_BASE_URL, GROQ_BASE_URL
+#                              per-provider endpoint, e.g. a local stand-in server
+
+HTTP_TIMEOUT = float(os.environ.get("LLM_HTTP_TIMEOUT", 120))
+CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", 10))
+MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", 20))
+KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_KEEPALIVE_CONNECTIONS", 10))
+KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", 60))
+HTTP2 = os.environ.get("LLM_HTTP2", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_http_client = None
+
+def base_url(provider):
+    """Endpoint configured for provider ("openai", "anthropic" or "groq"), or None for the SDK default."""
+    return os.environ.get(f"{provider.upper()}_BASE_URL") or None
+
+def timeout():
+    return httpx.Timeout(HTTP_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+# Pool settings shared by the sync and async clients
+def _pool_options(connections=None):
+    http2 = HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("[!] LLM_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        http2 = False
+    return {
+        "http2": http2,
+        "timeout": timeout(),
+        "limits": httpx.Limits(
+            max_connections=connections or MAX_CONNECTIONS,
+            max_keepalive_connections=connections or KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        "follow_redirects": True,
+    }
+
+def shared_http_client():
+    """Return the process-wide pooled httpx.Client, creating it on first use."""
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            # Counts requests and SDK retries on the active llmMetrics span
+            _http_client = httpx.Client(event_hooks={"request": [on_http_request]}, **_pool_options())
+        return _http_client
+
+async def _on_async_http_request(request):
+    on_http_request(request)
+
+def async_http_client(connections=None):
+    """A new pooled httpx.AsyncClient for the async SDK clients.
+
+    connections sizes the pool for that many concurrent requests (default
+    LLM_MAX_CONNECTIONS). Use it from a single event loop and close it with
+    `await client.aclose()`.
+    """
+    return httpx.AsyncClient(event_hooks={"request": [_on_async_http_request]}, **_pool_options(connections))
+
+@atexit.register
+def close_shared_client():
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+def openai_client(**options):
+    """openai.OpenAI on the shared connection pool; options are passed to the constructor."""
+    import openai
+    options.setdefault("base_url", base_url("openai"))
+    options.setdefault("timeout", timeout())
+    return openai.OpenAI(http_client=shared_http_client(), **options)
+
+def async_openai_client(connections=None, http_client=None, **options):
+    """openai.AsyncOpenAI on http_client, or on an async_http_client(connections) of its own.
+
+    Closing it with `await client.close()` also closes the pool.
+    """
+    import openai
+    options.setdefault("base_url", base_url("openai"))
+    options.setdefault("timeout", timeout())
+    return openai.AsyncOpenAI(http_client=http_client or async_http_client(connections), **options)
+
+def async_anthropic_client(connections=None, http_client=None, **options):
+    """anthropic.AsyncAnthropic on http_client, or on an async_http_client(connections) of its own.
+
+    Closing it with `await client.close()` also closes the pool.
+    """
+    import anthropic
+    options.setdefault("base_url", base_url("anthropic"))
+    options.setdefault("timeout", timeout())
+    return anthropic.AsyncAnthropic(http_client=http_client or async_http_client(connections), **options)
+
+def groq_client(**options):
+    """langchain_groq.ChatGroq on the shared connection pool; options are passed to the constructor."""
+    from langchain_groq import ChatGroq
+    if base_url("groq"):
+        options.setdefault("base_url", base_url("groq"))
+    options.setdefault("timeout", HTTP_TIMEOUT)
+    return ChatGroq(http_client=shared_http_client(), **options)
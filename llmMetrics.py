@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Timing and usage metrics for every LLM call made by the tools in this folder.
+# Each call is wrapped in a span that records its duration, time to first token,
+# token usage (including prompt cache reads and writes), tokens per second, time
+# spent queued, polls and retries. Finished
+# spans are appended as JSON lines to a rotating file and aggregated in memory for
+# an optional Prometheus text endpoint. Print percentiles with:
+#   python llmMetrics.py
+#   python llmMetrics.py --since 2024-06-01 --path llm_metrics.jsonl
+#
+# Settings come from the environment:
+#   LLM_METRICS_PATH      JSONL file (default llm_metrics.jsonl); LLM_METRICS_PATH=off disables it
+#   LLM_METRICS_MAX_MB    size at which the file is rotated (default 5)
+#   LLM_METRICS_BACKUPS   rotated files kept as <path>.1, <path>.2, ... (default 3)
+#   LLM_METRICS_PORT      serve Prometheus text metrics on this port (default off)
+
+METRICS_PATH = os.environ.get("LLM_METRICS_PATH", "llm_metrics.jsonl")
+METRICS_MAX_BYTES = int(float(os.environ.get("LLM_METRICS_MAX_MB", 5)) * 1024 * 1024)
+METRICS_BACKUPS = int(os.environ.get("LLM_METRICS_BACKUPS", 3))
+METRICS_PORT = int(os.environ.get("LLM_METRICS_PORT", 0))
+
+# Span, extra fields and last record of the running thread or asyncio task
+_current_span = ContextVar("llm_span", default=None)
+_current_fields = ContextVar("llm_fields", default={})
+_last_record = ContextVar("llm_last_record", default=None)
+_lock = threading.Lock()
+_logger = None
+_server = None
+_totals = {}  # (provider, operation, model, status) -> aggregated sums
+
+class Span:
+    """Measurements of one provider call; fill it in while the call runs."""
+
+    def __init__(self, provider, operation, model=None, **fields):
+        self.record = {"provider": provider, "operation": operation, "model": model}
+        self.record.update(_current_fields.get())
+        self.record.update(fields)
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.http_requests = 0
+        self.retries = 0
+
+    def first_token(self):
+        """Mark the arrival of the first streamed token; later calls are ignored."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def usage(self, input_tokens=None, output_tokens=None, cache_read_tokens=None, cache_write_tokens=None):
+        self.record["input_tokens"] = input_tokens
+        self.record["output_tokens"] = output_tokens
+        if cache_read_tokens is not None or cache_write_tokens is not None:
+            self.record["cache_read_tokens"] = cache_read_tokens or 0
+            self.record["cache_write_tokens"] = cache_write_tokens or 0
+
+    def anthropic_usage(self, usage):
+        """Record the usage of an Anthropic response, including prompt cache reads and writes."""
+        self.usage(usage.input_tokens, usage.output_tokens,
+                   getattr(usage, "cache_read_input_tokens", None),
+                   getattr(usage, "cache_creation_input_tokens", None))
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def finish(self, error=None):
+        end = time.perf_counter()
+        record = self.record
+        record.setdefault("status", "ok" if error is None else "error")
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        record["timestamp"] = datetime.now().isoformat(timespec="milliseconds")
+        record["duration_seconds"] = round(end - self.start, 4)
+        if self.first_token_at is not None:
+            record["ttft_seconds"] = round(self.first_token_at - self.start, 4)
+        output_tokens = record.get("output_tokens")
+        generation_start = self.first_token_at or self.start
+        if output_tokens and end > generation_start:
+            record["tokens_per_second"] = round(output_tokens / (end - generation_start), 2)
+        record["http_requests"] = self.http_requests
+        record["retries"] = self.retries
+        emit(record)
+        _last_record.set(record)
+        return record
+
+@contextmanager
+def span(provider, operation, model=None, **fields):
+    """Time the enclosed provider call and record it when the block exits.
+
+    HTTP requests sent through httpClients by this thread or asyncio task while
+    the block runs are counted on the span, including SDK retries.
+    """
+    current = Span(provider, operation, model, **fields)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(error=e)
+        raise
+    else:
+        current.finish()
+    finally:
+        _current_span.reset(token)
+
+def last_record():
+    """The record of the span most recently finished on this thread or asyncio task, or None."""
+    return _last_record.get()
+
+@contextmanager
+def context(**fields):
+    """Add fields, such as queued_seconds, to every span started on this thread inside the block."""
+    token = _current_fields.set(dict(_current_fields.get(), **fields))
+    try:
+        yield
+    finally:
+        _current_fields.reset(token)
+
+# httpx request hook installed by httpClients on the shared client; the SDKs
+# number their retries in the x-stainless-retry-count header
+def on_http_request(request):
+    current = _current_span.get()
+    if current is not None:
+        current.http_requests += 1
+        if int(request.headers.get("x-stainless-retry-count", 0) or 0) > 0:
+            current.retries += 1
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        _logger = logging.getLogger("llmMetrics")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        if METRICS_PATH.lower() != "off":
+            try:
+                handler = RotatingFileHandler(METRICS_PATH, maxBytes=METRICS_MAX_BYTES,
+                                              backupCount=METRICS_BACKUPS, encoding='utf-8')
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _logger.addHandler(handler)
+            except OSError as e:
+                print(f"[!] Metrics file unavailable: {e}")
+        if not _logger.handlers:
+            _logger.addHandler(logging.NullHandler())
+    return _logger
+
+def emit(record):
+    """Append a finished span to the metrics file and to the in-memory totals."""
+    with _lock:
+        logger = _get_logger()
+        if METRICS_PORT and _server is None:
+            start_server(METRICS_PORT)
+        key = (record["provider"], record["operation"], record.get("model") or "", record["status"])
+        totals = _totals.setdefault(key, dict.fromkeys(
+            ("count", "duration", "ttft", "ttft_count", "queued", "queued_count",
+             "input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens",
+             "retries", "polls"), 0))
+        totals["count"] += 1
+        totals["duration"] += record["duration_seconds"]
+        if "ttft_seconds" in record:
+            totals["ttft"] += record["ttft_seconds"]
+            totals["ttft_count"] += 1
+        if record.get("queued_seconds") is not None:
+            totals["queued"] += record["queued_seconds"]
+            totals["queued_count"] += 1
+        totals["input_tokens"] += record.get("input_tokens") or 0
+        totals["output_tokens"] += record.get("output_tokens") or 0
+        totals["cache_read_tokens"] += record.get("cache_read_tokens") or 0
+        totals["cache_write_tokens"] += record.get("cache_write_tokens") or 0
+        totals["retries"] += record.get("retries") or 0
+        totals["polls"] += record.get("polls") or 0
+    logger.info(json.dumps(record))
+
+def prometheus_text():
+    """Current totals in the Prometheus text exposition format."""
+    metrics = [
+        ("llm_requests_total", "counter", "Provider calls", [("", "count")]),
+        ("llm_request_duration_seconds", "summary", "Duration of provider calls", [("_sum", "duration"), ("_count", "count")]),
+        ("llm_time_to_first_token_seconds", "summary", "Time to the first streamed token", [("_sum", "ttft"), ("_count", "ttft_count")]),
+        ("llm_queued_seconds", "summary", "Time requests waited in a queue", [("_sum", "queued"), ("_count", "queued_count")]),
+        ("llm_input_tokens_total", "counter", "Prompt tokens not read from or written to the cache", [("", "input_tokens")]),
+        ("llm_cache_read_tokens_total", "counter", "Prompt tokens read from the prompt cache", [("", "cache_read_tokens")]),
+        ("llm_cache_write_tokens_total", "counter", "Prompt tokens written to the prompt cache", [("", "cache_write_tokens")]),
+        ("llm_output_tokens_total", "counter", "Completion tokens", [("", "output_tokens")]),
+        ("llm_retries_total", "counter", "HTTP retries made by the SDKs", [("", "retries")]),
+        ("llm_polls_total", "counter", "Status polls of Assistant runs", [("", "polls")]),
+    ]
+    with _lock:
+        totals = {key: dict(values) for key, values in _totals.items()}
+    lines = []
+    for name, kind, description, series in metrics:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (provider, operation, model, status), values in sorted(totals.items()):
+            labels = f'provider="{provider}",operation="{operation}",model="{model}",status="{status}"'
+            for suffix, field in series:
+                lines.append(f"{name}{suffix}{{{labels}}} {values[field]}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port):
+    """Serve prometheus_text() at http://127.0.0.1:<port>/metrics from a daemon thread."""
+    global _server
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    except OSError as e:
+        print(f"[!] Metrics endpoint unavailable on port {port}: {e}")
+        _server = False
+        return
+    threading.Thread(target=_server.serve_forever, name="llmMetrics", daemon=True).start()
+
+async def acreate_message(client, **request):
+    """await client.messages.create(**request) for AsyncAnthropic, recorded with its token usage."""
+    with span("anthropic", "messages.create", request.get("model")) as call:
+        response = await client.messages.create(**request)
+        call.anthropic_usage(response.usage)
+        return response
+
+def langchain_callback(current):
+    """LangChain callback handler that copies token usage of each LLM call into span current."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class UsageHandler(BaseCallbackHandler):
+        def on_llm_new_token(self, token, **kwargs):
+            current.first_token()
+
+        def on_llm_end(self, response, **kwargs):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            current.usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    return UsageHandler()
+
+# Nearest-rank percentile of a sorted list
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def read_records(path, since=None):
+    """Records of path and its rotated backups, oldest first."""
+    paths = [f"{path}.{index}" for index in range(METRICS_BACKUPS, 0, -1)] + [path]
+    records = []
+    for file_path in paths:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as metrics_file:
+            for line in metrics_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record.get("timestamp", "") >= since:
+                    records.append(record)
+    return records
+
+def report(records):
+    groups = {}
+    for record in records:
+        key = (record["provider"], record["operation"], record.get("model") or "-")
+        groups.setdefault(key, []).append(record)
+
+    def column(group, field, scale=1):
+        values = sorted(record[field] * scale for record in group if record.get(field) is not None)
+        return [percentile(values, fraction) for fraction in (0.5, 0.95, 0.99)]
+
+    def show(values, unit):
+        return " / ".join("-" if value is None else f"{value:.0f}{unit}" for value in values)
+
+    print("==============================")
+    for (provider, operation, model), group in sorted(groups.items()):
+        errors = sum(record.get("status") == "error" for record in group)
+        cancelled = sum(record.get("status") == "cancelled" for record in group)
+        retries = sum(record.get("retries") or 0 for record in group)
+        print(f"{provider} {operation} [{model}]: {len(group)} calls, {errors} errors, "
+              f"{cancelled} cancelled, {retries} retries")
+        print(f"{'duration p50/p95/p99':>26}: {show(column(group, 'duration_seconds', 1000), ' ms')}")
+        if any("ttft_seconds" in record for record in group):
+            print(f"{'first token p50/p95/p99':>26}: {show(column(group, 'ttft_seconds', 1000), ' ms')}")
+        if any("tokens_per_second" in record for record in group):
+            print(f"{'tokens/s p50/p95/p99':>26}: {show(column(group, 'tokens_per_second'), '')}")
+        if any(record.get("queued_seconds") is not None for record in group):
+            print(f"{'queued p50/p95/p99':>26}: {show(column(group, 'queued_seconds', 1000), ' ms')}")
+        if any(record.get("status") in ("hit", "miss") for record in group):
+            hits = sum(record.get("status") == "hit" for record in group)
+            print(f"{'response cache':>26}: {hits} hits, {len(group) - hits} misses")
+        if any("cache_read_tokens" in record for record in group):
+            print(f"{'prompt cache':>26}: {cache_summary(group)}")
+        if any("polls" in record for record in group):
+            print(f"{'polls p50/p95/p99':>26}: {show(column(group, 'polls'), '')}")
+
+def cache_summary(records):
+    """Prompt tokens read from the cache, written to it and processed uncached, summed over records."""
+    read = sum(record.get("cache_read_tokens") or 0 for record in records)
+    written = sum(record.get("cache_write_tokens") or 0 for record in records)
+    uncached = sum(record.get("input_tokens") or 0 for record in records)
+    prompt = read + written + uncached
+    hit_rate = f"{read / prompt:.0%}" if prompt else "-"
+    return f"{read} read, {written} written, {uncached} uncached tokens ({hit_rate} read from cache)"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print latency and usage percentiles of recorded LLM calls.")
+    parser.add_argument("--path", default=METRICS_PATH, help="metrics JSONL file (rotated backups are included)")
+    parser.add_argument("--since", help="only calls at or after this ISO timestamp, e.g. 2024-06-01")
+    args = parser.parse_args(argv)
+
+    records = read_records(args.path, args.since)
+    if not records:
+        print(f"[!] No metrics found in {args.path}")
+        return 1
+    report(records)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
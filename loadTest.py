@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from datetime import datetime
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+
+# Load generator for the request paths of the chat front-ends. Each target drives
+# the same chatProviders.py code a front-end runs for one prompt, from many threads
+# at once, and reports throughput and latency percentiles. With --serve the requests go to an
+# in-process mockServer.py, so no network access or API key is needed:
+#   python loadTest.py --target claude --concurrency 16 --requests 400 --serve
+#   python loadTest.py --target assistants --concurrency 8 --duration 30 --serve --error-rate 0.05
+# Prompt caching is measured by running a document session with and without it:
+#   python loadTest.py --target claude-document --serve --prefill-delay 0.05 --concurrency 4 --requests 48
+#   python loadTest.py --target claude-document --serve --prefill-delay 0.05 --concurrency 4 --requests 48 --no-cache
+# Without --serve the endpoints come from OPENAI_BASE_URL, ANTHROPIC_BASE_URL and
+# GROQ_BASE_URL (see httpClients.py), e.g. a mockServer.py started separately.
+#
+# Targets:
+#   claude        ClaudeChat.py: Anthropic messages.create
+#   claude-stream ClaudeGUI.py: ask_claude with a streamed answer
+#   claude-document ClaudeGUI.py: a dropped document followed by questions about it,
+#                 --turns prompts per conversation
+#   assistants    Helper.py: add a message, run the assistant, read the answer
+#   groq          GrogChat.py: ChatGroq through LangChain (needs langchain_groq)
+#   groq-stream   the same with a streamed answer
+
+PROMPT = "Summarize the main idea of the uploaded notes in two sentences."
+
+SYSTEM_PROMPT = "You are a study assistant. Answer questions about the documents the student uploads."
+
+class _Request:
+    """Stand-in for requestQueue.Request that records the time of the first delta."""
+
+    def __init__(self):
+        self.first_delta = None
+
+    def is_cancelled(self):
+        return False
+
+    def emit_delta(self, text):
+        if self.first_delta is None:
+            self.first_delta = time.perf_counter()
+
+def claude_target(args):
+    from httpClients import async_anthropic_client
+    from chatProviders import AnthropicProvider, loop_http_client, run
+    client = async_anthropic_client(http_client=loop_http_client(), api_key=os.environ.get("ANTHROPIC_API_KEY"), max_retries=args.max_retries)
+    # Without a conversation every prompt is sent on its own, so all workers share the provider
+    provider = AnthropicProvider("claude-3-opus-20240229", client=client, max_tokens=1000, temperature=0.99)
+
+    def session():
+        def send(prompt):
+            return None, run(provider.send(prompt)).metrics
+        return send
+    return session
+
+def claude_stream_target(args):
+    from httpClients import async_anthropic_client
+    from chatProviders import AnthropicProvider, loop_http_client
+    from ClaudeGUI import ask_claude
+    from conversationContext import ConversationContext
+    client = async_anthropic_client(http_client=loop_http_client(), api_key=os.environ.get("ANTHROPIC_API_KEY"), max_retries=args.max_retries)
+
+    def session():
+        def send(prompt):
+            request = _Request()
+            provider = AnthropicProvider("claude-3-opus-20240229", client=client, context=ConversationContext())
+            ask_claude(request, prompt, provider)
+            return request.first_delta, provider.last_reply.metrics
+        return send
+    return session
+
+def claude_document_target(args):
+    from httpClients import async_anthropic_client
+    from chatProviders import AnthropicProvider, loop_http_client
+    from ClaudeGUI import ask_claude
+    from conversationContext import ConversationContext
+    client = async_anthropic_client(http_client=loop_http_client(), api_key=os.environ.get("ANTHROPIC_API_KEY"), max_retries=args.max_retries)
+    documents = count(1)
+
+    def session():
+        conversation = {"provider": None, "turns": 0}
+
+        def send(prompt):
+            request = _Request()
+            if conversation["turns"] % args.turns == 0:
+                # New conversation, opened with its own document as ClaudeGUI sends a dropped PDF
+                number = next(documents)
+                words = " ".join(f"Paragraph {number}.{index} of the uploaded notes." for index in range(args.doc_tokens // 8))
+                context = ConversationContext(system=SYSTEM_PROMPT, prompt_caching=not args.no_cache)
+                conversation["provider"] = AnthropicProvider("claude-3-opus-20240229", client=client, context=context)
+                prompt = f"I've uploaded a PDF file. Here's the content:\n\n{words}\n\nPlease analyze this PDF content."
+                ask_claude(request, prompt, conversation["provider"], True)
+            else:
+                ask_claude(request, prompt, conversation["provider"])
+            conversation["turns"] += 1
+            return request.first_delta, conversation["provider"].last_reply.metrics
+        return send
+    return session
+
+def assistants_target(args):
+    from httpClients import openai_client, async_openai_client
+    from chatProviders import AssistantsProvider, loop_http_client, run
+    client = openai_client(max_retries=args.max_retries)
+    async_client = async_openai_client(http_client=loop_http_client(), max_retries=args.max_retries)
+    assistant = client.beta.assistants.create(model="gpt-4o", instructions="Load test", name="loadTest", tools=[])
+
+    def session():
+        # Runs on one thread cannot overlap, so every worker gets its own thread
+        provider = AssistantsProvider(assistant.id, client.beta.threads.create().id, client=async_client)
+
+        def send(prompt):
+            request = _Request()
+            if args.poll:
+                reply = run(provider.send(prompt))
+            else:
+                reply = run(provider.stream(prompt, on_delta=request.emit_delta))
+            if reply.status != "completed":
+                raise RuntimeError(f"Run ended with status: {reply.status}")
+            if not reply.text:
+                raise RuntimeError("No answer on the thread")
+            return request.first_delta, reply.metrics
+        return send
+    return session
+
+def groq_target(args, stream=False):
+    from httpClients import groq_client
+    from chatProviders import GroqProvider, loop_http_client, run
+    chat = groq_client(groq_api_key=os.environ.get("GROQ_API_KEY"), model_name="llama3-8b-8192",
+                       max_retries=args.max_retries, http_async_client=loop_http_client())
+    provider = GroqProvider("llama3-8b-8192", history_turns=0, chat=chat)
+
+    def session():
+        def send(prompt):
+            if not stream:
+                return None, run(provider.send(prompt)).metrics
+            request = _Request()
+            reply = run(provider.stream(prompt, on_delta=request.emit_delta))
+            if not reply.text:
+                raise RuntimeError("Empty streamed answer")
+            return request.first_delta, reply.metrics
+        return send
+    return session
+
+TARGETS = {
+    "claude": claude_target,
+    "claude-stream": claude_stream_target,
+    "claude-document": claude_document_target,
+    "assistants": assistants_target,
+    "groq": groq_target,
+    "groq-stream": lambda args: groq_target(args, stream=True),
+}
+
+def start_mock_server(args):
+    import mockServer
+    settings = mockServer.build_parser().parse_args([])
+    settings.port = 0
+    settings.latency = args.latency
+    settings.token_delay = args.token_delay
+    settings.tokens = args.tokens
+    settings.error_rate = args.error_rate
+    settings.drop_rate = args.drop_rate
+    settings.prefill_delay = args.prefill_delay
+    server = mockServer.serve(settings, background=True)
+    url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["ANTHROPIC_BASE_URL"] = url
+    os.environ["OPENAI_BASE_URL"] = url + "/v1"
+    os.environ["GROQ_BASE_URL"] = url
+    for key in ("ANTHROPIC_API_KEY", "OPENAI_API_KEY", "GROQ_API_KEY"):
+        os.environ.setdefault(key, "mock")
+    print(f"[✓] Mock server on {url}")
+    return server
+
+def run_load(args):
+    session_factory = TARGETS[args.target](args)
+    lock = threading.Lock()
+    results = []
+    issued = 0
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def next_request():
+        nonlocal issued
+        with lock:
+            if args.requests and issued >= args.requests:
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            issued += 1
+            return True
+
+    def worker(index):
+        send = session_factory()
+        while next_request():
+            start = time.perf_counter()
+            try:
+                # Time of the first delta and the llmMetrics record with the token usage of the call
+                first_delta, record = send(f"{PROMPT} (request from worker {index})")
+                error = None
+            except Exception as e:
+                first_delta = record = None
+                error = type(e).__name__
+            end = time.perf_counter()
+            with lock:
+                results.append({
+                    "latency": end - start,
+                    "ttft": None if first_delta is None else first_delta - start,
+                    "error": error,
+                    "usage": record,
+                })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(worker, index) for index in range(args.concurrency)]:
+            future.result()
+    return results, time.perf_counter() - start
+
+def summarize(results, wall_seconds, args):
+    from llmMetrics import percentile, cache_summary
+    latencies = sorted(result["latency"] for result in results if result["error"] is None)
+    ttfts = sorted(result["ttft"] for result in results if result["ttft"] is not None)
+    errors = {}
+    for result in results:
+        if result["error"] is not None:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+
+    usages = [result["usage"] for result in results if result["usage"] is not None]
+
+    def percentiles_ms(values):
+        return {name: None if not values else round(percentile(values, fraction) * 1000, 1)
+                for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {"target": args.target, "concurrency": args.concurrency, "requests": args.requests,
+                     "duration": args.duration, "serve": args.serve, "latency": args.latency,
+                     "token_delay": args.token_delay, "tokens": args.tokens, "error_rate": args.error_rate,
+                     "drop_rate": args.drop_rate, "max_retries": args.max_retries,
+                     "prefill_delay": args.prefill_delay, "turns": args.turns, "doc_tokens": args.doc_tokens,
+                     "no_cache": args.no_cache},
+        "requests": len(results),
+        "succeeded": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "requests_per_second": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": percentiles_ms(latencies),
+        "ttft_ms": percentiles_ms(ttfts),
+        "prompt_tokens": {field: sum(usage.get(field) or 0 for usage in usages)
+                          for field in ("input_tokens", "cache_read_tokens", "cache_write_tokens")},
+        "prompt_cache": cache_summary(usages) if any("cache_read_tokens" in usage for usage in usages) else None,
+    }
+
+def print_report(summary):
+    print("==============================")
+    print(f"{'target':>20}: {summary['settings']['target']} x {summary['settings']['concurrency']}")
+    print(f"{'requests':>20}: {summary['requests']} ({summary['succeeded']} succeeded)")
+    print(f"{'throughput':>20}: {summary['requests_per_second']} req/s over {summary['wall_seconds']} s")
+    for name in ("latency_ms", "ttft_ms"):
+        values = summary[name]
+        if values["p50"] is not None:
+            print(f"{name + ' p50/p95/p99':>20}: {values['p50']} / {values['p95']} / {values['p99']}")
+    tokens = summary["prompt_tokens"]
+    prompt_tokens = sum(tokens.values())
+    if prompt_tokens:
+        print(f"{'prompt tokens':>20}: {prompt_tokens} ({prompt_tokens / summary['succeeded']:.0f} per request)")
+    if summary["prompt_cache"]:
+        print(f"{'prompt cache':>20}: {summary['prompt_cache']}")
+    for error, number in sorted(summary["errors"].items()):
+        print(f"[✗] {number} x {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive a front-end request path at a target concurrency.")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="claude", help="request path to exercise")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at the same time")
+    parser.add_argument("--requests", type=int, default=200, help="total requests (0 for no limit)")
+    parser.add_argument("--duration", type=float, default=0, help="stop issuing requests after this many seconds")
+    parser.add_argument("--max-retries", type=int, default=2, help="SDK retries per request")
+    parser.add_argument("--poll", action="store_true", help="assistants target: poll runs instead of streaming")
+    parser.add_argument("--turns", type=int, default=6, help="claude-document target: prompts per conversation")
+    parser.add_argument("--doc-tokens", type=int, default=8000, help="claude-document target: size of each document")
+    parser.add_argument("--no-cache", action="store_true", help="claude-document target: send without prompt caching")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    mock = parser.add_argument_group("in-process mock server")
+    mock.add_argument("--serve", action="store_true", help="start mockServer.py in this process")
+    mock.add_argument("--latency", type=float, default=0.2, help="seconds before each response starts")
+    mock.add_argument("--token-delay", type=float, default=0.01, help="seconds per generated token")
+    mock.add_argument("--tokens", type=int, default=40, help="tokens in every reply")
+    mock.add_argument("--error-rate", type=float, default=0.0, help="fraction of POST requests that fail")
+    mock.add_argument("--prefill-delay", type=float, default=0.0,
+                      help="Anthropic: seconds per 1000 prompt tokens not read from the cache")
+    mock.add_argument("--drop-rate", type=float, default=0.0, help="fraction of streams cut off halfway")
+    args = parser.parse_args(argv)
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+
+    # Enough pooled connections for every worker, and no load-test records in the metrics file
+    os.environ.setdefault("LLM_MAX_CONNECTIONS", str(max(20, args.concurrency)))
+    os.environ.setdefault("LLM_KEEPALIVE_CONNECTIONS", str(max(10, args.concurrency)))
+    os.environ.setdefault("LLM_METRICS_PATH", "off")
+
+    server = start_mock_server(args) if args.serve else None
+    try:
+        results, wall_seconds = run_load(args)
+    except ImportError as e:
+        print(f"[✗] The {args.target} target needs a package that is not installed: {e}")
+        return 1
+    finally:
+        if server is not None:
+            server.shutdown()
+    summary = summarize(results, wall_seconds, args)
+    print_report(summary)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+        print(f"[✓] Results written to: {args.output}")
+    return 0 if summary["succeeded"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
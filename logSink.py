@@ -0,0 +1,78 @@
+import json
+import time
+import queue
+import threading
+import multiprocessing
+
+class LogSink:
+    """Background writer for log lines and structured JSON events.
+
+    Producers in this process or in worker processes put records on a
+    multiprocessing queue (pass sink.queue to the workers). A single thread in
+    the owning process drains it and appends to the log files in batches, every
+    flush_interval seconds or flush_lines records, whichever comes first. Lines
+    from different processes therefore never interleave and the files are
+    opened once per batch instead of once per message. Workers that only hold
+    the queue put ("text", line) or ("event", dict) tuples on it.
+    """
+
+    def __init__(self, text_path, json_path=None, flush_interval=1.0, flush_lines=200, echo=True):
+        self.text_path = text_path
+        self.json_path = json_path
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self.echo = echo
+        self.queue = multiprocessing.Queue()
+        self.thread = threading.Thread(target=self._drain, name="LogSink", daemon=True)
+        self.thread.start()
+
+    def write(self, line):
+        self.queue.put(("text", line))
+
+    def event(self, record):
+        self.queue.put(("event", record))
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread."""
+        self.queue.put(None)
+        self.thread.join()
+        self.queue.close()
+
+    def _drain(self):
+        lines = []
+        events = []
+        running = True
+        deadline = time.monotonic() + self.flush_interval
+        while running:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    running = False
+                else:
+                    kind, payload = item
+                    if kind == "text":
+                        if self.echo:
+                            print(payload)
+                        lines.append(payload)
+                    else:
+                        events.append(payload)
+                    pending = len(lines) + len(events)
+                    if pending < self.flush_lines and time.monotonic() < deadline:
+                        continue
+            except queue.Empty:
+                pass
+            self._flush(lines, events)
+            lines = []
+            events = []
+            deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, lines, events):
+        try:
+            if lines:
+                with open(self.text_path, 'a', encoding='utf-8') as log_file:
+                    log_file.write("\n".join(lines) + "\n")
+            if events and self.json_path:
+                with open(self.json_path, 'a', encoding='utf-8') as json_file:
+                    json_file.write("".join(json.dumps(record) + "\n" for record in events))
+        except Exception as e:
+            print(f"[✗] Failed to write log: {str(e)}")
@@ -0,0 +1,481 @@
+import re
+import sys
+import json
+import hashlib
+import time
+import random
+import argparse
+import threading
+from itertools import count
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the provider endpoints used in this folder, for load tests and
+# benchmarks without network access or API costs. It implements:
+#   Anthropic   POST /v1/messages (JSON or server-sent events), with a simulated
+#               prompt cache for blocks marked with cache_control
+#   OpenAI      the Assistants endpoints used by assistantTools.py: assistants,
+#               threads, messages, runs (streamed or polled), run cancel, files
+#   Groq        POST /openai/v1/chat/completions (also /v1/chat/completions)
+# Point the tools at it through httpClients, for example:
+#   python mockServer.py --port 8765 --latency 0.3 --token-delay 0.02 --error-rate 0.05
+#   set ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+#   set OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+#   set GROQ_BASE_URL=http://127.0.0.1:8765
+# With --prefill-delay every Anthropic request also waits for its prompt to be
+# processed: the full delay per 1000 uncached or cache-written tokens, and
+# CACHE_READ_COST of it for tokens read from the cache. Requests are counted per route
+# in MockState.requests (see checkAssistantRequests.py).
+
+WORDS = (
+    "the model answers every question with a short mock reply so that latency "
+    "throughput and streaming can be measured without calling a real provider"
+).split()
+
+# Share of the prefill delay charged for prompt tokens read from the cache
+CACHE_READ_COST = 0.1
+
+# Blocks before a cache breakpoint at which earlier cached prefixes are looked up
+CACHE_LOOKBACK_BLOCKS = 20
+
+class MockState:
+    """Threads, messages and runs of the mock Assistants API, plus the response settings."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.lock = threading.RLock()
+        self.ids = count(1)
+        self.assistants = {}  # assistant_id -> assistant object
+        self.files = {}  # file_id -> file object
+        self.threads = {}  # thread_id -> list of messages
+        self.runs = {}  # run_id -> run record
+        self.prompt_cache = {}  # hash of a cached prompt prefix -> expiry time
+        self.requests = Counter()  # route handler name -> requests received
+        self.random = random.Random(settings.seed)
+
+    def new_id(self, prefix):
+        return f"{prefix}_mock{next(self.ids)}"
+
+    def reply_words(self):
+        words = [WORDS[index % len(WORDS)] for index in range(self.settings.tokens)]
+        words[0] = words[0].capitalize()
+        return [word + " " for word in words[:-1]] + [words[-1] + "."]
+
+    def prompt_usage(self, body):
+        """Uncached, cache-read and cache-written prompt tokens of an Anthropic request.
+
+        Like the real cache, each block marked with cache_control caches the
+        prompt up to and including it, and reads the longest prefix cached by
+        an earlier request that ends at most CACHE_LOOKBACK_BLOCKS before it.
+        """
+        system = body.get("system") or []
+        blocks = [("system", block) for block in ([{"type": "text", "text": system}] if isinstance(system, str) else system)]
+        for message in body.get("messages", []):
+            content = message["content"]
+            for block in [{"type": "text", "text": content}] if isinstance(content, str) else content:
+                blocks.append((message["role"], block))
+
+        prefix = hashlib.sha256()
+        total = 0
+        boundaries = []  # (hash of the prompt up to the end of a block, its tokens)
+        breakpoints = []  # indexes into boundaries of the blocks marked with cache_control
+        for role, block in blocks:
+            text = block.get("text") or json.dumps(block)
+            prefix.update(f"{role}\0{text}\0".encode('utf-8'))
+            total += len(text) // 4 + 1
+            boundaries.append((prefix.hexdigest(), total))
+            if block.get("cache_control") and total >= self.settings.cache_min_tokens:
+                breakpoints.append(len(boundaries) - 1)
+
+        now = time.time()
+        read = 0
+        with self.lock:
+            for index in breakpoints:
+                for key, tokens in boundaries[max(0, index - CACHE_LOOKBACK_BLOCKS):index + 1]:
+                    if self.prompt_cache.get(key, 0) > now:
+                        read = max(read, tokens)
+            for index in breakpoints:
+                self.prompt_cache[boundaries[index][0]] = now + self.settings.cache_ttl
+        written = max(0, boundaries[breakpoints[-1]][1] - read) if breakpoints else 0
+        return total - read - written, read, written
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+def _message(message_id, thread_id, role, text, run_id=None, status="completed"):
+    return {"id": message_id, "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "status": status, "assistant_id": None,
+            "run_id": run_id, "attachments": [], "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}] if text else []}
+
+def _run(run, status=None):
+    return {"id": run["id"], "object": "thread.run", "created_at": int(run["created"]),
+            "thread_id": run["thread_id"], "assistant_id": run["assistant_id"],
+            "status": status or run["status"], "model": "mock-assistant", "instructions": "",
+            "tools": [], "parallel_tool_calls": True, "metadata": {},
+            "usage": {"prompt_tokens": run["input_tokens"], "completion_tokens": run["output_tokens"],
+                      "total_tokens": run["input_tokens"] + run["output_tokens"]}
+                     if (status or run["status"]) == "completed" else None}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # MockState, set by serve()
+
+    def log_message(self, format, *args):
+        if self.state.settings.verbose:
+            super().log_message(format, *args)
+
+    # ---- responses ----
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        self.send_json({"type": "error", "error": {"type": kind, "message": message}}, status)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_event(self, event, data):
+        text = f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+        if event:
+            text = f"event: {event}\n" + text
+        chunk = text.encode('utf-8')
+        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def stream_words(self, words, send_word):
+        """Send each word after the token delay; returns False if the stream was dropped."""
+        settings = self.state.settings
+        drop_at = len(words) // 2 if self.state.roll(settings.drop_rate) else None
+        for index, word in enumerate(words):
+            if index == drop_at:
+                # Injected failure: close the connection in the middle of the stream
+                self.close_connection = True
+                return False
+            time.sleep(settings.token_delay)
+            send_word(word)
+        return True
+
+    # ---- dispatch ----
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Type", "").startswith("application/json") and data:
+            return json.loads(data)
+        return {}
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        body = self.read_body() if method == "POST" else {}
+        handler, groups = None, ()
+        for pattern, route_method, route_handler in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if match and method == route_method:
+                handler, groups = route_handler, match.groups()
+                break
+        with self.state.lock:
+            self.state.requests[handler.__name__ if handler else "unknown"] += 1
+
+        settings = self.state.settings
+        time.sleep(settings.latency)
+        if method == "POST" and self.state.roll(settings.error_rate):
+            status = self.state.random.choice(settings.error_status)
+            return self.send_error_json(status, f"Injected error {status}")
+        if handler is None:
+            return self.send_error_json(404, f"No mock for {method} {url.path}")
+        handler(self, body, parse_qs(url.query), *groups)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        try:
+            self.handle_request(method)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, e.g. it cancelled a stream
+            self.close_connection = True
+
+    # ---- Anthropic ----
+    def anthropic_messages(self, body, query):
+        words = self.state.reply_words()
+        input_tokens, cache_read, cache_written = self.state.prompt_usage(body)
+        usage = {"input_tokens": input_tokens, "output_tokens": 0,
+                 "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_written}
+        message = {"id": self.state.new_id("msg"), "type": "message", "role": "assistant",
+                   "model": body.get("model", "mock"), "content": [], "stop_reason": None,
+                   "stop_sequence": None, "usage": usage}
+        settings = self.state.settings
+        time.sleep(settings.prefill_delay * (input_tokens + cache_written + CACHE_READ_COST * cache_read) / 1000)
+        if not body.get("stream"):
+            time.sleep(settings.token_delay * len(words))
+            message.update(content=[{"type": "text", "text": "".join(words)}], stop_reason="end_turn",
+                           usage=dict(usage, output_tokens=len(words)))
+            return self.send_json(message)
+
+        self.start_stream()
+        self.send_event("message_start", {"type": "message_start", "message": message})
+        self.send_event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                "content_block": {"type": "text", "text": ""}})
+        completed = self.stream_words(words, lambda word: self.send_event("content_block_delta", {
+            "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word}}))
+        if not completed:
+            return
+        self.send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self.send_event("message_delta", {"type": "message_delta",
+                                          "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                          "usage": {"output_tokens": len(words)}})
+        self.send_event("message_stop", {"type": "message_stop"})
+        self.end_stream()
+
+    # ---- Groq / OpenAI chat completions ----
+    def chat_completions(self, body, query):
+        words = self.state.reply_words()
+        input_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_id = self.state.new_id("chatcmpl")
+        model = body.get("model", "mock")
+        usage = {"prompt_tokens": input_tokens, "completion_tokens": len(words),
+                 "total_tokens": input_tokens + len(words)}
+        if not body.get("stream"):
+            time.sleep(self.state.settings.token_delay * len(words))
+            return self.send_json({"id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                                   "model": model, "usage": usage, "choices": [{
+                                       "index": 0, "finish_reason": "stop",
+                                       "message": {"role": "assistant", "content": "".join(words)}}]})
+
+        def chunk(delta, finish_reason=None):
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        self.start_stream()
+        self.send_event(None, chunk({"role": "assistant", "content": ""}))
+        if not self.stream_words(words, lambda word: self.send_event(None, chunk({"content": word}))):
+            return
+        final = chunk({}, "stop")
+        final["x_groq"] = {"usage": usage}
+        self.send_event(None, final)
+        self.send_event(None, "[DONE]")
+        self.end_stream()
+
+    # ---- OpenAI Assistants ----
+    def create_assistant(self, body, query):
+        assistant = {"id": self.state.new_id("asst"), "object": "assistant", "created_at": int(time.time()),
+                     "name": body.get("name"), "model": body.get("model", "mock"),
+                     "instructions": body.get("instructions"), "tools": body.get("tools", []), "metadata": {}}
+        with self.state.lock:
+            self.state.assistants[assistant["id"]] = assistant
+        self.send_json(assistant)
+
+    def retrieve_assistant(self, body, query, assistant_id):
+        with self.state.lock:
+            assistant = self.state.assistants.get(assistant_id)
+        if assistant is None:
+            return self.send_error_json(404, f"No assistant {assistant_id}")
+        self.send_json(assistant)
+
+    def create_thread(self, body, query):
+        thread_id = self.state.new_id("thread")
+        with self.state.lock:
+            self.state.threads[thread_id] = []
+        self.send_json({"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}})
+
+    def retrieve_thread(self, body, query, thread_id):
+        with self.state.lock:
+            known = thread_id in self.state.threads
+        if not known:
+            return self.send_error_json(404, f"No thread {thread_id}")
+        self.send_json({"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}})
+
+    def thread_messages(self, thread_id):
+        with self.state.lock:
+            if thread_id not in self.state.threads:
+                self.state.threads[thread_id] = []
+            return self.state.threads[thread_id]
+
+    def create_message(self, body, query, thread_id):
+        with self.state.lock:
+            known = thread_id in self.state.threads
+        if not known:
+            return self.send_error_json(404, f"No thread {thread_id}")
+        content = body.get("content")
+        text = content if isinstance(content, str) else json.dumps(content)
+        message = _message(self.state.new_id("msg"), thread_id, body.get("role", "user"), text)
+        message["attachments"] = body.get("attachments") or []
+        with self.state.lock:
+            self.thread_messages(thread_id).append(message)
+        self.send_json(message)
+
+    def list_messages(self, body, query, thread_id):
+        self.complete_runs()
+        with self.state.lock:
+            messages = list(self.thread_messages(thread_id))
+        if query.get("order", ["desc"])[0] == "desc":
+            messages.reverse()
+        after = query.get("after", [None])[0]
+        if after:
+            ids = [message["id"] for message in messages]
+            messages = messages[ids.index(after) + 1:] if after in ids else []
+        limit = int(query.get("limit", [20])[0])
+        page = messages[:limit]
+        self.send_json({"object": "list", "data": page, "has_more": len(messages) > limit,
+                        "first_id": page[0]["id"] if page else None, "last_id": page[-1]["id"] if page else None})
+
+    def complete_runs(self):
+        """Finish polled runs whose simulated generation time has passed."""
+        now = time.monotonic()
+        with self.state.lock:
+            for run in self.state.runs.values():
+                if run["status"] in ("queued", "in_progress") and now >= run["done_at"]:
+                    run["status"] = "completed"
+                    self.state.threads.setdefault(run["thread_id"], []).append(
+                        _message(run["message_id"], run["thread_id"], "assistant", run["text"], run["id"]))
+                elif run["status"] == "queued":
+                    run["status"] = "in_progress"
+
+    def create_run(self, body, query, thread_id):
+        with self.state.lock:
+            if thread_id not in self.state.threads:
+                return self.send_error_json(404, f"No thread {thread_id}")
+            if body.get("assistant_id") not in self.state.assistants:
+                return self.send_error_json(404, f"No assistant {body.get('assistant_id')}")
+        words = self.state.reply_words()
+        run = {"id": self.state.new_id("run"), "thread_id": thread_id, "assistant_id": body.get("assistant_id"),
+               "status": "queued", "created": time.time(), "message_id": self.state.new_id("msg"),
+               "text": "".join(words), "input_tokens": sum(len(m["content"][0]["text"]["value"]) // 4
+                                                          for m in self.thread_messages(thread_id) if m["content"]),
+               "output_tokens": len(words), "done_at": time.monotonic() + self.state.settings.token_delay * len(words)}
+        with self.state.lock:
+            self.state.runs[run["id"]] = run
+        if not body.get("stream"):
+            return self.send_json(_run(run))
+
+        thread_messages = self.thread_messages(thread_id)
+        message = _message(run["message_id"], thread_id, "assistant", "", run["id"], "in_progress")
+        self.start_stream()
+        self.send_event("thread.run.created", _run(run))
+        self.send_event("thread.run.in_progress", _run(run, "in_progress"))
+        self.send_event("thread.message.created", message)
+        completed = self.stream_words(words, lambda word: self.send_event("thread.message.delta", {
+            "id": run["message_id"], "object": "thread.message.delta",
+            "delta": {"content": [{"index": 0, "type": "text", "text": {"value": word, "annotations": []}}]}}))
+        with self.state.lock:
+            if not completed:
+                run["status"] = "failed"
+                return
+            if run["status"] == "cancelling":
+                run["status"] = "cancelled"
+                return
+            run["status"] = "completed"
+            final = _message(run["message_id"], thread_id, "assistant", run["text"], run["id"])
+            thread_messages.append(final)
+        self.send_event("thread.message.completed", final)
+        self.send_event("thread.run.completed", _run(run))
+        self.send_event("done", "[DONE]")
+        self.end_stream()
+
+    def retrieve_run(self, body, query, thread_id, run_id):
+        self.complete_runs()
+        with self.state.lock:
+            run = self.state.runs.get(run_id)
+            if run is not None and run["status"] == "cancelling":
+                run["status"] = "cancelled"
+        if run is None:
+            return self.send_error_json(404, f"No run {run_id}")
+        self.send_json(_run(run))
+
+    def cancel_run(self, body, query, thread_id, run_id):
+        with self.state.lock:
+            run = self.state.runs.get(run_id)
+            if run is not None and run["status"] in ("queued", "in_progress"):
+                run["status"] = "cancelling"
+        if run is None:
+            return self.send_error_json(404, f"No run {run_id}")
+        self.send_json(_run(run))
+
+    def upload_file(self, body, query):
+        uploaded = {"id": self.state.new_id("file"), "object": "file", "bytes": 0,
+                    "created_at": int(time.time()), "filename": "upload", "purpose": "assistants",
+                    "status": "processed"}
+        with self.state.lock:
+            self.state.files[uploaded["id"]] = uploaded
+        self.send_json(uploaded)
+
+    def retrieve_file(self, body, query, file_id):
+        with self.state.lock:
+            uploaded = self.state.files.get(file_id)
+        if uploaded is None:
+            return self.send_error_json(404, f"No file {file_id}")
+        self.send_json(uploaded)
+
+ROUTES = [
+    (r"/v1/messages", "POST", MockHandler.anthropic_messages),
+    (r"(?:/openai)?/v1/chat/completions", "POST", MockHandler.chat_completions),
+    (r"/v1/assistants", "POST", MockHandler.create_assistant),
+    (r"/v1/assistants/([^/]+)", "GET", MockHandler.retrieve_assistant),
+    (r"/v1/threads", "POST", MockHandler.create_thread),
+    (r"/v1/threads/([^/]+)", "GET", MockHandler.retrieve_thread),
+    (r"/v1/threads/([^/]+)/messages", "POST", MockHandler.create_message),
+    (r"/v1/threads/([^/]+)/messages", "GET", MockHandler.list_messages),
+    (r"/v1/threads/([^/]+)/runs", "POST", MockHandler.create_run),
+    (r"/v1/threads/([^/]+)/runs/([^/]+)", "GET", MockHandler.retrieve_run),
+    (r"/v1/threads/([^/]+)/runs/([^/]+)/cancel", "POST", MockHandler.cancel_run),
+    (r"/v1/files", "POST", MockHandler.upload_file),
+    (r"/v1/files/([^/]+)", "GET", MockHandler.retrieve_file),
+]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI, Anthropic and Groq endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response starts")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per generated token")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens in every reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of POST requests that fail")
+    parser.add_argument("--error-status", type=lambda text: [int(code) for code in text.split(",")],
+                        default=[500], help="comma-separated status codes used for injected errors")
+    parser.add_argument("--prefill-delay", type=float, default=0.0,
+                        help="Anthropic: seconds per 1000 prompt tokens not read from the cache")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024,
+                        help="Anthropic: shortest prompt prefix that is cached")
+    parser.add_argument("--cache-ttl", type=float, default=300, help="Anthropic: seconds a cached prefix is kept")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of streams cut off halfway")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the error injection")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser
+
+def serve(settings, background=False):
+    """Start the mock server; with background=True it runs in a daemon thread and the server is returned."""
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(settings)})
+    server = ThreadingHTTPServer((settings.host, settings.port), handler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="mockServer", daemon=True).start()
+        return server
+    print(f"[✓] Mock LLM server on http://{settings.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return server
+
+if __name__ == "__main__":
+    serve(build_parser().parse_args())
+    sys.exit(0)
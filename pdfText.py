@@ -0,0 +1,154 @@
+import os
+import mmap
+import array
+import hashlib
+import threading
+from contextlib import closing
+
+# Shared PDF text pipeline used by generateSummaries.py, ClaudeChatUL.py and ClaudeGUI.py.
+# Pages are extracted one at a time so a large document is never copied page by page
+# into a growing string.
+#
+# Extracted pages are cached on disk by content hash, so a document already seen by
+# any tool is not parsed again. Each document is stored as two files in
+# PDF_TEXT_CACHE_DIR:
+#   <sha256>.txt  the UTF-8 text of all pages, back to back
+#   <sha256>.idx  n + 1 unsigned 64-bit byte offsets, page i is txt[idx[i]:idx[i + 1]]
+# The text file is memory-mapped when read, so only the requested pages are loaded.
+
+# Location of the extraction cache; override with the PDF_TEXT_CACHE environment variable
+PDF_TEXT_CACHE_DIR = os.environ.get(
+    "PDF_TEXT_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "CommandLineGPT", "pdf_text")
+)
+
+# SHA-256 of a file's content, read in blocks
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_paths(digest):
+    base = os.path.join(PDF_TEXT_CACHE_DIR, digest)
+    return base + ".txt", base + ".idx"
+
+# Yield cached pages of a document from the memory-mapped text file, or None if not cached
+def _read_cached_pages(digest, first_page, last_page):
+    text_path, index_path = _cache_paths(digest)
+    try:
+        offsets = array.array('Q')
+        with open(index_path, 'rb') as index_file:
+            offsets.frombytes(index_file.read())
+        text_file = open(text_path, 'rb')
+    except (OSError, ValueError):
+        return None
+    return _iter_mapped(text_file, offsets, first_page, last_page)
+
+def _iter_mapped(text_file, offsets, first_page, last_page):
+    page_count = len(offsets) - 1
+    stop = page_count if last_page is None else min(last_page, page_count)
+    with text_file:
+        if offsets[-1] == 0:
+            # mmap cannot map an empty file: every page is empty
+            for _ in range(first_page, stop):
+                yield ""
+            return
+        with mmap.mmap(text_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for index in range(first_page, stop):
+                yield mapped[offsets[index]:offsets[index + 1]].decode('utf-8', 'surrogatepass')
+
+# Remove the temporary files of an unfinished cache entry
+def _discard_entry(text_file, temp_paths):
+    try:
+        text_file.close()
+    except OSError:
+        pass
+    for temp_path in temp_paths:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+# Extract pages with PyPDF2; when write_cache is set, store them once every page has been read.
+# A cache that cannot be written (e.g. a read-only home directory) only turns caching off.
+def _extract_pages(pdf_path, digest, first_page, last_page, write_cache):
+    import PyPDF2
+    text_file = None
+    offsets = array.array('Q', [0])
+    if write_cache:
+        text_path, index_path = _cache_paths(digest)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        temp_paths = (text_path + suffix, index_path + suffix)
+        try:
+            os.makedirs(PDF_TEXT_CACHE_DIR, exist_ok=True)
+            text_file = open(temp_paths[0], 'wb')
+        except OSError:
+            text_file = None
+    try:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            pages = reader.pages
+            stop = len(pages) if last_page is None else min(last_page, len(pages))
+            for index in range(first_page, stop):
+                text = pages[index].extract_text() or ""
+                if text_file is not None:
+                    data = text.encode('utf-8', 'surrogatepass')
+                    try:
+                        text_file.write(data)
+                        offsets.append(offsets[-1] + len(data))
+                    except OSError:
+                        _discard_entry(text_file, temp_paths)
+                        text_file = None
+                yield text
+        if text_file is not None:
+            try:
+                text_file.close()
+                with open(temp_paths[1], 'wb') as index_file:
+                    index_file.write(offsets.tobytes())
+                # The index is published last: its presence marks a complete entry
+                os.replace(temp_paths[0], text_path)
+                os.replace(temp_paths[1], index_path)
+                text_file = None
+            except OSError:
+                pass
+    finally:
+        if text_file is not None:
+            # Extraction failed, the consumer stopped early or the entry could not be
+            # published: discard the partial entry
+            _discard_entry(text_file, temp_paths)
+
+def iter_pdf_pages(pdf_path, first_page=0, last_page=None, max_chars=None, normalize=False, use_cache=True):
+    """Yield the text of each page of a PDF lazily.
+
+    first_page and last_page select a zero-based, end-exclusive page range.
+    max_chars stops the extraction once that many characters have been yielded.
+    With normalize=True line breaks are folded into spaces. With use_cache the
+    pages come from the shared extraction cache when the document has been seen
+    before; a whole-document read of a new document fills the cache.
+    """
+    pages = None
+    digest = None
+    if use_cache:
+        digest = file_digest(pdf_path)
+        pages = _read_cached_pages(digest, first_page, last_page)
+    if pages is None:
+        whole_document = first_page == 0 and last_page is None and max_chars is None
+        pages = _extract_pages(pdf_path, digest, first_page, last_page, use_cache and whole_document)
+
+    remaining = max_chars
+    with closing(pages):
+        for text in pages:
+            if remaining is not None and remaining <= 0:
+                return
+            if normalize:
+                text = text.replace("\n", " ")
+            if remaining is not None:
+                text = text[:remaining]
+                remaining -= len(text)
+            yield text
+
+def extract_pdf_text(pdf_path, separator="\n", **options):
+    """Join the pages yielded by iter_pdf_pages with separator in a single pass."""
+    return separator.join(iter_pdf_pages(pdf_path, **options))
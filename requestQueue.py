@@ -0,0 +1,119 @@
+import time
+import threading
+from itertools import count
+from llmMetrics import context as metrics_context
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+# Long-lived worker pool shared by the Qt front-ends. Requests are queued on a
+# QThreadPool that lives as long as the window, can be cancelled while waiting or
+# running, and their results are delivered on the GUI thread in submission order
+# even when several workers finish out of order.
+
+class Request:
+    """Handle passed to a task: lets it stream partial output and see cancellation."""
+
+    def __init__(self, request_id, queue):
+        self.id = request_id
+        self._queue = queue
+        self._cancelled = threading.Event()
+        self.submitted = time.perf_counter()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def emit_delta(self, text):
+        if not self.is_cancelled():
+            self._queue.delta_ready.emit(self.id, text)
+
+class _Runner(QRunnable):
+    def __init__(self, queue, request, task, args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.queue = queue
+        self.request = request
+        self.task = task
+        self.args = args
+
+    def run(self):
+        request = self.request
+        if request.is_cancelled():
+            self.queue._finished.emit(request.id, None, True)
+            return
+        self.queue.started.emit(request.id)
+        try:
+            # Provider calls made by the task record how long it waited in the queue
+            with metrics_context(queued_seconds=round(time.perf_counter() - request.submitted, 4)):
+                result = self.task(request, *self.args)
+        except Exception as e:
+            result = e
+        self.queue._finished.emit(request.id, result, request.is_cancelled())
+
+class RequestQueue(QObject):
+    """Queue of background tasks run by a fixed pool of worker threads.
+
+    submit(task, *args) returns a request ID and later calls
+    task(request, *args) on a worker. started, delta_ready and result_ready
+    carry that ID; result_ready(request_id, result, cancelled) is emitted once
+    per request, in the order the requests were submitted. With workers=1 the
+    tasks also run one at a time in that order, which is what a conversation
+    needs. A task that raises delivers the exception as its result; a request
+    cancelled before it started delivers None.
+    """
+
+    started = pyqtSignal(int)
+    delta_ready = pyqtSignal(int, str)
+    result_ready = pyqtSignal(int, object, bool)
+    pending_changed = pyqtSignal(int)  # requests submitted but not yet delivered
+    _finished = pyqtSignal(int, object, bool)
+
+    def __init__(self, workers=1, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self.ids = count(1)
+        self.runners = {}  # request_id -> _Runner, until delivered
+        self.completed = {}  # request_id -> (result, cancelled), waiting for earlier requests
+        self.next_delivery = 1
+        self._finished.connect(self._on_finished)
+
+    def submit(self, task, *args):
+        request_id = next(self.ids)
+        runner = _Runner(self, Request(request_id, self), task, args)
+        self.runners[request_id] = runner
+        self.pool.start(runner)
+        self.pending_changed.emit(len(self.runners))
+        return request_id
+
+    def pending(self):
+        return len(self.runners)
+
+    def cancel(self, request_id=None):
+        """Cancel one request, or every pending and running request when request_id is None."""
+        request_ids = list(self.runners) if request_id is None else [request_id]
+        for request_id in request_ids:
+            runner = self.runners.get(request_id)
+            if runner is None or runner.request.is_cancelled():
+                continue
+            runner.request.cancel()
+            if self.pool.tryTake(runner):
+                # Still waiting: it will never run, so complete it right away
+                self._on_finished(request_id, None, True)
+
+    def shutdown(self):
+        """Cancel everything and wait for running tasks to return."""
+        self.cancel()
+        self.pool.waitForDone()
+
+    @pyqtSlot(int, object, bool)
+    def _on_finished(self, request_id, result, cancelled):
+        self.completed[request_id] = (result, cancelled)
+        while self.next_delivery in self.completed:
+            request_id = self.next_delivery
+            result, cancelled = self.completed.pop(request_id)
+            self.runners.pop(request_id, None)
+            self.next_delivery += 1
+            self.result_ready.emit(request_id, result, cancelled)
+        self.pending_changed.emit(len(self.runners))
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+from llmMetrics import span
+
+# Persistent response cache for the single-turn Claude scripts (ClaudeQA.py, and
+# ClaudeChat.py with --cache). Identical requests are answered from a SQLite database instead
+# of the API. The key is a hash of the normalized model, temperature, max_tokens,
+# system prompt and messages, so whitespace and line-ending differences do not
+# cause misses. Entries expire after RESPONSE_CACHE_TTL seconds, and the least
+# recently used entries are evicted once the database holds more than
+# RESPONSE_CACHE_MAX_ENTRIES entries or RESPONSE_CACHE_MAX_MB of responses.
+# Print the hit and miss counts with:
+#   python responseCache.py stats
+#   python responseCache.py clear
+#
+# Settings come from the environment:
+#   CLAUDE_RESPONSE_CACHE        database file; CLAUDE_RESPONSE_CACHE=off disables the cache
+#   CLAUDE_RESPONSE_CACHE_TTL    seconds an answer stays valid (default 7 days)
+#   CLAUDE_RESPONSE_CACHE_MAX_MB / CLAUDE_RESPONSE_CACHE_ENTRIES   size limits (default 50 MB, 5000)
+#   CLAUDE_RESPONSE_CACHE_BYPASS=1   send every request and refresh its entry (same as --no-cache)
+
+RESPONSE_CACHE_PATH = os.environ.get(
+    "CLAUDE_RESPONSE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "CommandLineGPT", "responses.sqlite3")
+)
+RESPONSE_CACHE_TTL = float(os.environ.get("CLAUDE_RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+RESPONSE_CACHE_MAX_BYTES = int(float(os.environ.get("CLAUDE_RESPONSE_CACHE_MAX_MB", 50)) * 1024 * 1024)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("CLAUDE_RESPONSE_CACHE_ENTRIES", 5000))
+RESPONSE_CACHE_BYPASS = os.environ.get("CLAUDE_RESPONSE_CACHE_BYPASS", "") not in ("", "0")
+
+# Counters kept in the database, reported by the stats command
+COUNTERS = ("hits", "misses", "expired", "bypassed", "stores", "evictions")
+
+# Request fields that change the answer; anything else (e.g. timeouts) is not part of the key
+KEY_FIELDS = ("model", "max_tokens", "temperature", "top_p", "top_k", "stop_sequences", "system", "messages")
+
+def _normalize_text(text):
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n"))
+    return "\n".join(line.rstrip() for line in text.strip().split("\n"))
+
+def _normalize(value):
+    # Text blocks and plain strings compare equal; cache_control does not change the answer
+    if isinstance(value, str):
+        return _normalize_text(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        if value.get("type") == "text" and "text" in value:
+            return _normalize_text(value["text"])
+        return {key: _normalize(item) for key, item in value.items() if key != "cache_control"}
+    return value
+
+def request_key(request):
+    """Hash of the normalized fields of a messages.create request that determine its answer."""
+    fields = {name: _normalize(request[name]) for name in KEY_FIELDS if request.get(name) is not None}
+    for message in fields.get("messages", []):
+        if isinstance(message.get("content"), list) and len(message["content"]) == 1 and isinstance(message["content"][0], str):
+            message["content"] = message["content"][0]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """SQLite store of Anthropic responses with a TTL and LRU eviction by size and count."""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, "
+                            "created REAL, last_used REAL, hits INTEGER, size INTEGER, response TEXT)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            self.db.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [(name,) for name in COUNTERS])
+
+    def _count(self, name, amount=1):
+        self.db.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key):
+        """Cached response JSON for key, or None; counts the hit or miss."""
+        now = time.time()
+        with self.lock, self.db:
+            row = self.db.execute("SELECT created, response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[0] > self.ttl:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count("expired")
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self.db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count("hits")
+            return row[1]
+
+    def put(self, key, model, response_json):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, 0, ?, ?)",
+                            (key, model, now, now, len(response_json.encode('utf-8')), response_json))
+            self._count("stores")
+            self._evict(now)
+
+    def bypassed(self):
+        with self.lock, self.db:
+            self._count("bypassed")
+
+    def _evict(self, now):
+        evicted = self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+        count, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count > self.max_entries or size > self.max_bytes:
+            # Walk from the most recently used entry and drop everything past the limits
+            kept = kept_size = 0
+            cutoff = None
+            for last_used, entry_size in self.db.execute("SELECT last_used, size FROM responses ORDER BY last_used DESC"):
+                if kept + 1 > self.max_entries or kept_size + entry_size > self.max_bytes:
+                    cutoff = last_used
+                    break
+                kept += 1
+                kept_size += entry_size
+            if cutoff is not None:
+                evicted += self.db.execute("DELETE FROM responses WHERE last_used <= ?", (cutoff,)).rowcount
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.db.execute("SELECT name, value FROM counters"))
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return dict(counters, entries=entries, size_bytes=size,
+                    hit_rate=counters["hits"] / lookups if lookups else None)
+
+    def clear(self):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM responses")
+            self.db.execute("UPDATE counters SET value = 0")
+        self.db.execute("VACUUM")
+
+    def close(self):
+        self.db.close()
+
+def open_cache(path=RESPONSE_CACHE_PATH):
+    """The response cache at path, or None when it is turned off or cannot be opened."""
+    if path.lower() == "off":
+        return None
+    try:
+        return ResponseCache(path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[!] Response cache unavailable: {e}")
+        return None
+
+def cached_response(cache, request, bypass=RESPONSE_CACHE_BYPASS):
+    """The cached Message answering request, or None when it has to be sent."""
+    if bypass:
+        cache.bypassed()
+        return None
+    from anthropic.types import Message
+    with span("anthropic", "response_cache", request.get("model")) as call:
+        cached = cache.get(request_key(request))
+        call.set(status="miss" if cached is None else "hit")
+    return None if cached is None else Message.model_validate_json(cached)
+
+def store_response(cache, request, response):
+    cache.put(request_key(request), request.get("model"), response.model_dump_json())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or clear the Claude response cache.")
+    parser.add_argument("command", choices=["stats", "clear"], nargs="?", default="stats")
+    parser.add_argument("--path", default=RESPONSE_CACHE_PATH, help="cache database")
+    args = parser.parse_args(argv)
+
+    if args.path.lower() == "off" or not os.path.exists(args.path):
+        print(f"[!] No response cache at {args.path}")
+        return 1
+    cache = ResponseCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+        print(f"[✓] Response cache cleared: {args.path}")
+        return 0
+    stats = cache.stats()
+    hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}"
+    print("==============================")
+    print(f"{'cache':>12}: {args.path}")
+    print(f"{'entries':>12}: {stats['entries']} ({stats['size_bytes'] / 1024 / 1024:.2f} MB)")
+    print(f"{'hits':>12}: {stats['hits']}")
+    print(f"{'misses':>12}: {stats['misses']} ({stats['expired']} expired)")
+    print(f"{'hit rate':>12}: {hit_rate}")
+    print(f"{'bypassed':>12}: {stats['bypassed']}")
+    print(f"{'stored':>12}: {stats['stores']}, {stats['evictions']} evicted")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
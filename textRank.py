@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import numpy
+from scipy import sparse
+from sumy.parsers.plaintext import PlaintextParser
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.summarizers.text_rank import TextRankSummarizer
+
+# Vectorized TextRank for long documents. sumy compares every pair of sentences in
+# pure Python; here the sentence/word count matrix is built once and the
+# similarity matrix is a single sparse product, so only the power iteration
+# scales with the number of sentence pairs that actually share words.
+
+class SparseTextRankSummarizer(TextRankSummarizer):
+    """Drop-in replacement for sumy's TextRankSummarizer.
+
+    It rates sentences with the same edge weights, damping and stopping rule as
+    sumy, so both summarizers select the same sentences.
+    """
+
+    def rate_sentences(self, document):
+        sentences = document.sentences
+        ranks = self.rank_vector([self._to_words_set(sentence) for sentence in sentences])
+        return {sentence: rank for sentence, rank in zip(sentences, ranks)}
+
+    def rank_vector(self, sentences_as_words):
+        sentences_count = len(sentences_as_words)
+        vocabulary = {}
+        rows = []
+        columns = []
+        for i, words in enumerate(sentences_as_words):
+            for word in words:
+                rows.append(i)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)))
+
+        # counts[i, w] = occurrences of word w in sentence i; duplicates are summed
+        counts = sparse.csr_matrix(
+            (numpy.ones(len(rows)), (rows, columns)),
+            shape=(sentences_count, max(1, len(vocabulary)))
+        )
+        # sumy's edge rank sum(words2.count(w) for w in words1) is the dot product of count vectors
+        overlap = (counts @ counts.T).tocoo()
+
+        lengths = numpy.array([len(words) for words in sentences_as_words], dtype=float)
+        log_lengths = numpy.log(numpy.maximum(lengths, 1.0))
+        norm = log_lengths[overlap.row] + log_lengths[overlap.col]
+        single_words = numpy.isclose(norm, 0.0)
+        values = numpy.where(single_words, overlap.data, overlap.data / numpy.where(single_words, 1.0, norm))
+        weights = sparse.csr_matrix((values, (overlap.row, overlap.col)), shape=(sentences_count, sentences_count))
+
+        row_sums = numpy.asarray(weights.sum(axis=1)).ravel() + self._ZERO_DIVISION_PREVENTION
+
+        # Power method on (1 - d) / n + d * W, with W the row-normalized weights.
+        # The similarity matrix is symmetric, so W^T p = weights @ (p / row_sums).
+        p_vector = numpy.full(sentences_count, 1.0 / sentences_count)
+        teleport = (1.0 - self.damping) / sentences_count
+        lambda_val = 1.0
+        while lambda_val > self.epsilon:
+            next_p = teleport * p_vector.sum() + self.damping * (weights @ (p_vector / row_sums))
+            lambda_val = numpy.linalg.norm(next_p - p_vector)
+            p_vector = next_p
+        return p_vector
+
+def compare_with_sumy(text, percentage=25, language="english"):
+    """Summarize text with sumy and with SparseTextRankSummarizer.
+
+    Returns whether both selected the same sentences, plus the time each took.
+    """
+    parser = PlaintextParser.from_string(text, Tokenizer(language))
+    document = parser.document
+    sentence_count = max(1, len(document.sentences) * percentage // 100)
+
+    start = time.perf_counter()
+    reference = TextRankSummarizer()(document, sentence_count)
+    sumy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = SparseTextRankSummarizer()(document, sentence_count)
+    sparse_time = time.perf_counter() - start
+
+    same = [str(sentence) for sentence in reference] == [str(sentence) for sentence in candidate]
+    return same, sumy_time, sparse_time
+
+# Synthetic corpus checked when no files are given: page counts of the PDFs and the seed
+SAMPLE_PAGES = (1, 2, 5, 10, 20)
+SAMPLE_SEED = 42
+
+def sample_corpus(directory, pages=SAMPLE_PAGES, seed=SAMPLE_SEED):
+    """Write the PDFs of benchmarkSummaries.py, one per page count, into directory; returns their paths."""
+    import random
+    from benchmarkSummaries import write_pdf
+    rnd = random.Random(seed)
+    paths = []
+    for count in pages:
+        path = os.path.join(directory, f"sample_{count:02d}_pages.pdf")
+        write_pdf(path, count, rnd)
+        paths.append(path)
+    return paths
+
+# Check the sparse engine against sumy on a reference corpus of PDF or text files:
+# python textRank.py file1.pdf file2.txt ...
+# Without files, a seeded synthetic corpus of PDFs is generated and checked instead.
+if __name__ == "__main__":
+    import tempfile
+    from pdfText import extract_pdf_text
+
+    paths = sys.argv[1:]
+    sample_dir = None
+    if not paths:
+        sample_dir = tempfile.TemporaryDirectory(prefix="textrank_check_")
+        paths = sample_corpus(sample_dir.name)
+        print(f"[!] No files given; checking {len(paths)} synthetic PDFs (seed {SAMPLE_SEED})")
+
+    mismatches = 0
+    for path in paths:
+        if path.lower().endswith('.pdf'):
+            # Keep the temporary sample PDFs out of the shared extraction cache
+            text = extract_pdf_text(path, separator=" ", normalize=True, use_cache=sample_dir is None)
+        else:
+            with open(path, 'r', encoding='utf-8') as file:
+                text = file.read()
+        same, sumy_time, sparse_time = compare_with_sumy(text)
+        mismatches += not same
+        status = "[✓]" if same else "[✗]"
+        print(f"{status} {path}: sumy {sumy_time:.3f}s, sparse {sparse_time:.3f}s")
+    if sample_dir is not None:
+        sample_dir.cleanup()
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,269 @@
+import os
+import math
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication, QMenu
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer
+from PyQt5.QtGui import QPainter, QTextLayout, QTextOption
+
+# Virtualized transcript widget for the Qt front-ends. A QTextEdit lays out the
+# whole conversation again as it grows, so appends to a long session (with pasted
+# PDF text) stutter. Here every entry is laid out once when it is added, entry
+# positions are kept as running offsets, and a repaint only draws the lines in
+# view, so appending and scrolling cost the same at any session length. Older
+# entries are paged out to a temporary file and read back when scrolled into view,
+# which keeps memory bounded.
+
+# Entries kept in memory; older ones are paged out to disk in batches of PAGE_OUT_BATCH
+LOADED_ENTRIES = 400
+PAGE_OUT_BATCH = 100
+
+# Paged-out entries kept in memory after being read back for display
+PAGE_CACHE_ENTRIES = 200
+
+# Text layouts of recently drawn entries kept for repainting
+LAYOUT_CACHE_ENTRIES = 64
+
+# Characters of one entry that are drawn; the full text is kept for copying
+MAX_DISPLAY_CHARS = 20000
+
+# Spacing around entries (pixels)
+MARGIN = 6
+ENTRY_SPACING = 2
+
+# Characters of an entry as drawn; QTextLayout breaks lines at U+2028 rather than at newlines
+def display_text(text):
+    if len(text) > MAX_DISPLAY_CHARS:
+        text = text[:MAX_DISPLAY_CHARS] + f" … ({len(text) - MAX_DISPLAY_CHARS} more characters)"
+    return text.replace("\n", "\u2028") or " "
+
+class TranscriptStore:
+    """Text of the transcript entries; all but the newest ones live in a temporary file."""
+
+    def __init__(self, loaded_entries=LOADED_ENTRIES, cache_entries=PAGE_CACHE_ENTRIES):
+        self.loaded_entries = loaded_entries
+        self.cache_entries = cache_entries
+        self.loaded = []  # texts of entries first_loaded, first_loaded + 1, ...
+        self.first_loaded = 0
+        self.offsets = array('Q', [0])  # paged-out entry i is file[offsets[i]:offsets[i + 1]]
+        self.file = None
+        self.cache = OrderedDict()  # entry -> text, least recently read first
+
+    def __len__(self):
+        return self.first_loaded + len(self.loaded)
+
+    def append(self, text):
+        self.loaded.append(text)
+        if len(self.loaded) > self.loaded_entries + PAGE_OUT_BATCH:
+            self._page_out(PAGE_OUT_BATCH)
+
+    def extend_last(self, text):
+        self.loaded[-1] += text
+
+    def text(self, entry):
+        if entry >= self.first_loaded:
+            return self.loaded[entry - self.first_loaded]
+        text = self.cache.get(entry)
+        if text is None:
+            self.file.seek(self.offsets[entry])
+            text = self.file.read(self.offsets[entry + 1] - self.offsets[entry]).decode('utf-8')
+            self.cache[entry] = text
+            if len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(entry)
+        return text
+
+    def texts(self):
+        """Every entry in order; paged-out entries are read sequentially and not cached."""
+        if self.file is not None:
+            self.file.seek(0)
+            for entry in range(self.first_loaded):
+                yield self.file.read(self.offsets[entry + 1] - self.offsets[entry]).decode('utf-8')
+        yield from self.loaded
+
+    def _page_out(self, count):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix="transcript_")
+        self.file.seek(0, os.SEEK_END)
+        for text in self.loaded[:count]:
+            data = text.encode('utf-8')
+            self.file.write(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        del self.loaded[:count]
+        self.first_loaded += count
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class TranscriptView(QAbstractScrollArea):
+    """Read-only, scrollable list of text entries that only lays out what changes.
+
+    append(text) adds an entry and extend_last(text) grows the newest one,
+    e.g. with streamed deltas. The view follows new entries while it is
+    scrolled to the bottom. Right-click copies an entry or the whole transcript.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = TranscriptStore()
+        self.heights = array('l')
+        self.tops = array('q')  # top of each entry; entry i spans tops[i] .. tops[i] + heights[i]
+        self.total_height = 0
+        self.layouts = OrderedDict()  # entry -> QTextLayout at layout_width, least recently drawn first
+        self.layout_width = self.text_width()
+        self.verticalScrollBar().setSingleStep(20)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+
+        # Entries are measured again for a new width once resizing settles
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.setInterval(100)
+        self.relayout_timer.timeout.connect(self.relayout)
+
+    def text_width(self):
+        return max(50, self.viewport().width() - 2 * MARGIN)
+
+    def build_layout(self, text):
+        """Word-wrapped layout of text at the current width, and its height."""
+        layout = QTextLayout(display_text(text), self.font())
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        width = self.text_width()
+        height = 0.0
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, height))
+            height += line.height()
+        layout.endLayout()
+        return layout, math.ceil(height) + ENTRY_SPACING
+
+    def measure(self, entry, text):
+        layout, height = self.build_layout(text)
+        self.layouts[entry] = layout
+        self.layouts.move_to_end(entry)
+        if len(self.layouts) > LAYOUT_CACHE_ENTRIES:
+            self.layouts.popitem(last=False)
+        return height
+
+    def entry_layout(self, entry):
+        layout = self.layouts.get(entry)
+        if layout is None:
+            self.measure(entry, self.store.text(entry))
+            return self.layouts[entry]
+        self.layouts.move_to_end(entry)
+        return layout
+
+    def append(self, text):
+        following = self.at_bottom()
+        self.store.append(text)
+        height = self.measure(len(self.heights), text)
+        self.heights.append(height)
+        self.tops.append(self.total_height)
+        self.total_height += height
+        self.update_scroll_range(following)
+
+    def extend_last(self, text):
+        if not len(self.store):
+            return self.append(text)
+        following = self.at_bottom()
+        self.store.extend_last(text)
+        last = len(self.store) - 1
+        height = self.measure(last, self.store.text(last))
+        self.total_height += height - self.heights[-1]
+        self.heights[-1] = height
+        self.update_scroll_range(following)
+
+    def clear(self):
+        self.store.close()
+        self.store = TranscriptStore()
+        self.heights = array('l')
+        self.tops = array('q')
+        self.total_height = 0
+        self.layouts.clear()
+        self.update_scroll_range(True)
+
+    def toPlainText(self):
+        return "\n".join(self.store.texts())
+
+    def at_bottom(self):
+        scroll_bar = self.verticalScrollBar()
+        return scroll_bar.value() >= scroll_bar.maximum()
+
+    def update_scroll_range(self, follow):
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setPageStep(self.viewport().height())
+        scroll_bar.setRange(0, max(0, self.total_height + 2 * MARGIN - self.viewport().height()))
+        if follow:
+            scroll_bar.setValue(scroll_bar.maximum())
+        self.viewport().update()
+
+    def entry_at(self, y):
+        """Entry at viewport position y, or None."""
+        content_y = y + self.verticalScrollBar().value() - MARGIN
+        entry = bisect_right(self.tops, content_y) - 1
+        if 0 <= entry < len(self.tops) and content_y < self.tops[entry] + self.heights[entry]:
+            return entry
+        return None
+
+    def relayout(self):
+        # Keep the entry at the top of the view in place while every height changes
+        top_entry = max(0, bisect_right(self.tops, self.verticalScrollBar().value()) - 1)
+        following = self.at_bottom()
+        self.layout_width = self.text_width()
+        self.layouts.clear()
+        self.heights = array('l', (self.build_layout(text)[1] for text in self.store.texts()))
+        self.tops = array('q')
+        total = 0
+        for height in self.heights:
+            self.tops.append(total)
+            total += height
+        self.total_height = total
+        self.update_scroll_range(following)
+        if not following and top_entry < len(self.tops):
+            self.verticalScrollBar().setValue(self.tops[top_entry])
+
+    # ---- Qt events ----
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.text_width() != self.layout_width:
+            self.relayout_timer.start()
+        self.update_scroll_range(self.at_bottom())
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setPen(self.palette().text().color())
+        offset = self.verticalScrollBar().value() - MARGIN
+        clip = event.rect()
+        entry = max(0, bisect_right(self.tops, clip.top() + offset) - 1)
+        while entry < len(self.tops) and self.tops[entry] - offset < clip.bottom():
+            # Lines of the entry outside the clip rectangle are skipped
+            top = self.tops[entry] - offset
+            self.entry_layout(entry).draw(painter, QPointF(MARGIN, top), [], QRectF(clip))
+            entry += 1
+        painter.end()
+
+    def contextMenuEvent(self, event):
+        entry = self.entry_at(event.pos().y())
+        menu = QMenu(self)
+        copy_entry = menu.addAction("Copy message")
+        copy_entry.setEnabled(entry is not None)
+        copy_all = menu.addAction("Copy transcript")
+        chosen = menu.exec_(event.globalPos())
+        if chosen is copy_entry:
+            QApplication.clipboard().setText(self.store.text(entry))
+        elif chosen is copy_all:
+            QApplication.clipboard().setText(self.toPlainText())